@@ -1,9 +1,11 @@
 fastapi==0.104.1
 uvicorn[standard]==0.24.0
 pymongo==4.6.0
+motor==3.3.2
 celery==5.3.4
 redis==5.0.1
 python-multipart==0.0.6
 aiofiles==23.2.1
 pydantic==2.5.0
 python-dotenv==1.0.0
+# av==18.1.0  # optional: in-process media backend (MEDIA_BACKEND=pyav)
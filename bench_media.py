@@ -0,0 +1,111 @@
+"""
+Media analysis benchmark: per-video wall time of the duration + thumbnail step
+
+Synthetic H.264/AAC clips of each length are generated with ffmpeg's lavfi
+sources, then every method is timed on each of them.
+
+Thumbnail latency should stay roughly flat across clip lengths with the
+fast and keyframe seek modes, and grow with length with accurate seeking.
+Each method is also reported as tasks per CPU-second (one core), counting
+the CPU time of ffprobe/ffmpeg child processes. The PyAV backend is
+included when PyAV is installed.
+
+Usage: python bench_media.py [--lengths 10,60,600] [--runs 5] [--dir /tmp]
+"""
+import os
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+import tasks
+
+
+def make_clip(directory, seconds):
+    """Encode a 720p30 test pattern with a sine tone, cached between runs"""
+    path = os.path.join(directory, f"bench_{seconds}s.mp4")
+    if not os.path.exists(path):
+        subprocess.run([
+            'ffmpeg', '-v', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=duration={seconds}:size=1280x720:rate=30',
+            '-f', 'lavfi', '-i', f'sine=duration={seconds}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '60',
+            '-c:a', 'aac', '-shortest', '-y', path
+        ], check=True)
+    return path
+
+
+def two_step(video_path, thumbnail_path):
+    """The original path: ffprobe for the duration, then ffmpeg for the thumbnail"""
+    _, duration_seconds = tasks.get_video_duration(video_path)
+    tasks.generate_thumbnail(video_path, thumbnail_path, duration_seconds, "accurate")
+
+
+def pipeline(seek_mode, backend="subprocess"):
+    """The probe and thumbnail stages' media work with the given seek mode and backend"""
+    def method(video_path, thumbnail_path):
+        probe = tasks.probe_media(video_path, backend)
+        duration_seconds = tasks.probe_duration(probe)
+        stream = tasks.video_stream(probe)
+        tasks.render_thumbnail(
+            video_path, thumbnail_path, duration_seconds,
+            probe["format"]["format_name"].split(",")[0], stream["index"], seek_mode, backend
+        )
+    return method
+
+
+METHODS = {
+    "two-step": two_step,
+    "accurate": pipeline("accurate"),
+    "fast": pipeline("fast"),
+    "keyframe": pipeline("keyframe"),
+}
+if tasks.av is not None:
+    METHODS.update({
+        "pyav accurate": pipeline("accurate", "pyav"),
+        "pyav fast": pipeline("fast", "pyav"),
+        "pyav keyframe": pipeline("keyframe", "pyav"),
+    })
+
+
+def cpu_seconds():
+    """User + system CPU time of this process and its finished children"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def run(method, video_path, thumbnail_path, runs):
+    """Median wall time in milliseconds and tasks per CPU-second of one method on one clip"""
+    method(video_path, thumbnail_path)  # warm the page cache
+    timings = []
+    cpu_start = cpu_seconds()
+    for _ in range(runs):
+        start = time.perf_counter()
+        method(video_path, thumbnail_path)
+        timings.append((time.perf_counter() - start) * 1000)
+    cpu = cpu_seconds() - cpu_start
+    return statistics.median(timings), runs / cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", default="10,60,600", help="Clip lengths in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    thumbnail_path = os.path.join(args.dir, "bench_thumb.jpg")
+    print(f"{'clip':<8}{'method':<16}{'wall':>12}{'tasks/core-s':>14}")
+    for seconds in (int(length) for length in args.lengths.split(",")):
+        video_path = make_clip(args.dir, seconds)
+        for name, method in METHODS.items():
+            wall, rate = run(method, video_path, thumbnail_path, args.runs)
+            print(f"{seconds:>6}s  {name:<16}{wall:>9.1f} ms{rate:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
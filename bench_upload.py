@@ -0,0 +1,106 @@
+"""
+Upload path benchmark: legacy 1 KiB aiofiles copy vs. the upload engine
+
+The zero-copy baseline is what the kernel alone can do; the API hashes
+every upload, so the engine with blake2b is the path it actually takes.
+
+Usage: python bench_upload.py [--size-mb 1024] [--runs 3] [--dir /tmp]
+"""
+import os
+import time
+import asyncio
+import argparse
+import resource
+import hashlib
+import tempfile
+import aiofiles
+from starlette.datastructures import UploadFile
+from upload_engine import UploadEngine
+
+
+async def legacy_save_upload_file(upload_file: UploadFile, destination: str):
+    """The original save_upload_file implementation"""
+    async with aiofiles.open(destination, 'wb') as f:
+        while chunk := await upload_file.read(1024):
+            await f.write(chunk)
+
+
+def cpu_seconds():
+    """User + system CPU time of this process, including worker threads"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def make_spool(size, directory):
+    """Build a rolled-over multipart spool file of the given size, like python-multipart does"""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, dir=directory)
+    block = os.urandom(1024 * 1024)
+    remaining = size
+    while remaining > 0:
+        remaining -= spool.write(block[:min(remaining, len(block))])
+    spool.seek(0)
+    return UploadFile(spool, size=size, filename="bench.mp4")
+
+
+def kernel_copy(upload: UploadFile, destination: str):
+    """
+    Zero-copy baseline: copy_file_range/sendfile from the spool file. The
+    API cannot use it because it hashes every upload, which needs the bytes
+    in userspace; it is kept here as the lower bound for the engine
+    """
+    source_fd = upload.file.fileno()
+    offset = upload.file.tell()
+    fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while True:
+            if hasattr(os, "copy_file_range"):
+                n = os.copy_file_range(source_fd, fd, 64 * 1024 * 1024, offset)
+            else:
+                n = os.sendfile(fd, source_fd, offset, 64 * 1024 * 1024)
+            if n == 0:
+                return
+            offset += n
+    finally:
+        os.close(fd)
+
+
+async def run(name, save, size, directory, runs):
+    """Time one implementation and print MB/s and CPU-seconds per GB"""
+    rates, cpu_per_gb = [], []
+    for _ in range(runs):
+        upload = make_spool(size, directory)
+        destination = os.path.join(directory, f"bench_{name}.bin")
+        wall_start, cpu_start = time.perf_counter(), cpu_seconds()
+        await save(upload, destination)
+        wall, cpu = time.perf_counter() - wall_start, cpu_seconds() - cpu_start
+        upload.file.close()
+        os.remove(destination)
+        rates.append(size / wall / 1e6)
+        cpu_per_gb.append(cpu / (size / 1e9))
+    print(f"{name:<28} {max(rates):>10.1f} MB/s {min(cpu_per_gb):>10.2f} CPU-s/GB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    engine = UploadEngine()
+
+    print(f"{'implementation':<28} {'throughput':>15} {'cpu':>18}")
+    await run("legacy (1 KiB aiofiles)", legacy_save_upload_file, size, args.dir, args.runs)
+    await run("zero-copy baseline", lambda u, d: asyncio.to_thread(kernel_copy, u, d), size, args.dir, args.runs)
+    await run("engine (unhashed)", lambda u, d: engine.save(u.file, d, u.size), size, args.dir, args.runs)
+    # What the API runs: uploads are hashed for deduplication
+    await run(
+        "engine (blake2b)",
+        lambda u, d: engine.save(u.file, d, u.size, hashlib.blake2b(digest_size=32)),
+        size, args.dir, args.runs
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+import os
+import json
+from typing import Optional
+
+# Environment variables
+VIDEO_CACHE_TTL = int(os.getenv("VIDEO_CACHE_TTL", "300"))
+VIDEO_CACHE_NEGATIVE_TTL = int(os.getenv("VIDEO_CACHE_NEGATIVE_TTL", "30"))
+
+# Cached value for IDs that do not exist
+MISSING = "__missing__"
+
+# Stream metadata the worker extracts from the probe
+MEDIA_FIELDS = (
+    "duration_seconds", "video_codec", "width", "height", "frame_rate", "bit_rate", "rotation",
+    "audio_codec", "audio_channels", "audio_channel_layout", "audio_sample_rate"
+)
+
+# Fields served by /video-status/ and /video-metadata/
+CACHED_FIELDS = ("filename", "upload_time", "status", "duration", "thumbnail_filename", "version") + MEDIA_FIELDS
+CACHED_PROJECTION = {field: 1 for field in CACHED_FIELDS}
+
+
+def video_cache_key(video_id: str) -> str:
+    return f"video_cache:{video_id}"
+
+
+def encode_video(doc: dict) -> str:
+    """Serialize the cached fields of a video document"""
+    return json.dumps({field: doc.get(field) for field in CACHED_FIELDS})
+
+
+def decode_video(value: str) -> Optional[dict]:
+    """Deserialize a cache entry; None for a cached miss"""
+    if value == MISSING:
+        return None
+    return json.loads(value)
@@ -0,0 +1,142 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set
+import redis.asyncio as aioredis
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables
+VIDEO_EVENTS_CHANNEL = os.getenv("VIDEO_EVENTS_CHANNEL", "video_events")
+
+Listener = Callable[[dict], None]
+
+
+def encode_event(video_id: str, status: str, **fields) -> str:
+    """Serialize a video status event for the events channel"""
+    return json.dumps({"id": video_id, "status": status, **fields})
+
+
+def format_sse(event: dict, event_type: str = "status") -> str:
+    """Format an event as a Server-Sent Events message"""
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+
+def queue_listener(queue: asyncio.Queue) -> Listener:
+    """
+    Listener that feeds a bounded queue. When a slow consumer lets the queue
+    fill up the oldest event is dropped, since newer statuses supersede it
+    """
+    def listener(event: dict):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+    return listener
+
+
+class UpdateBatcher:
+    """
+    Listener for one WebSocket connection. Events are coalesced per video
+    until the connection takes the next batch, so a slow client gets the
+    latest state of each video rather than an ever-growing backlog
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, dict] = {}
+        self._ready = asyncio.Event()
+
+    def __call__(self, event: dict):
+        self.pending.setdefault(event["id"], {}).update(event)
+        self._ready.set()
+
+    def discard(self, video_id: str):
+        """Drop pending updates for a video"""
+        self.pending.pop(video_id, None)
+
+    async def next_batch(self, tick: float) -> List[dict]:
+        """Wait for updates, give more a tick to arrive, then take them all"""
+        await self._ready.wait()
+        await asyncio.sleep(tick)
+        self._ready.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+
+class EventBroker:
+    """
+    Fans video status events out to in-process listeners.
+
+    The process holds a single Redis pub/sub subscription to the events
+    channel that the Celery worker publishes to; each connected client only
+    registers a cheap in-memory listener, so one process can serve thousands
+    of event streams.
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, channel: str = VIDEO_EVENTS_CHANNEL):
+        self.redis = redis_client
+        self.channel = channel
+        self._listeners: Dict[str, Set[Listener]] = {}
+        self._firehose: Set[Listener] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start consuming the events channel"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop consuming the events channel"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(self, video_id: Optional[str], listener: Listener) -> Callable[[], None]:
+        """
+        Register a listener for one video, or for all videos if video_id is
+        None. Returns a function that removes the listener again
+        """
+        listeners = self._firehose if video_id is None else self._listeners.setdefault(video_id, set())
+        listeners.add(listener)
+
+        def unsubscribe():
+            listeners.discard(listener)
+            # Only drop the set if a later subscriber has not replaced it
+            if video_id is not None and not listeners and self._listeners.get(video_id) is listeners:
+                del self._listeners[video_id]
+        return unsubscribe
+
+    def publish_local(self, event: dict):
+        """Deliver an event to the matching listeners in this process"""
+        for listener in list(self._listeners.get(event["id"], ())) + list(self._firehose):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Event listener failed: {e}")
+
+    async def _run(self):
+        """Relay messages from Redis, resubscribing after connection errors"""
+        delay = 1
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1
+                async for message in pubsub.listen():
+                    try:
+                        event = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    self.publish_local(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Video events subscription lost, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                await pubsub.close()
@@ -0,0 +1,84 @@
+import logging
+from typing import List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Index options that change what an index does; any difference means the
+# existing index has to be rebuilt
+SIGNIFICANT_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+# Indexes required by the queries in main.py and tasks.py
+VIDEO_INDEXES = [
+    # list_videos keyset pagination
+    IndexModel([("upload_time", DESCENDING), ("_id", DESCENDING)], name="upload_time_id"),
+    # Listing filtered by status, newest first
+    IndexModel([("status", ASCENDING), ("upload_time", DESCENDING)], name="status_upload_time"),
+    # Lookups by Celery task ID
+    IndexModel([("task_id", ASCENDING)], name="task_id", sparse=True),
+    # Upload deduplication; only the record that owns the content carries the hash
+    IndexModel([("content_hash", ASCENDING)], name="content_hash", unique=True, sparse=True),
+]
+
+
+def _options(spec: dict) -> dict:
+    """The significant options of an index spec or index_information() entry"""
+    return {key: spec[key] for key in SIGNIFICANT_OPTIONS if spec.get(key)}
+
+
+async def ensure_indexes(collection, indexes: List[IndexModel] = VIDEO_INDEXES):
+    """
+    Reconcile the collection's indexes with the declared ones. Missing
+    indexes are created and indexes whose options differ are rebuilt.
+    Undeclared indexes are reported but left alone. Safe to run repeatedly.
+    """
+    await report_index_builds(collection)
+
+    existing = await collection.index_information()
+    by_key = {tuple(info["key"]): (name, info) for name, info in existing.items()}
+
+    to_create = []
+    for index in indexes:
+        spec = index.document
+        key = tuple(spec["key"].items())
+        current = by_key.pop(key, None)
+        if current is None:
+            to_create.append(index)
+        elif _options(current[1]) != _options(spec):
+            logger.warning(f"Rebuilding index {current[0]}: options changed to {_options(spec)}")
+            await collection.drop_index(current[0])
+            to_create.append(index)
+
+    for name, _ in by_key.values():
+        if name != "_id_":
+            logger.info(f"Index {name} on {collection.name} is not declared in indexes.py")
+
+    if to_create:
+        names = await collection.create_indexes(to_create)
+        logger.info(f"Created indexes on {collection.name}: {', '.join(names)}")
+    else:
+        logger.info(f"Indexes on {collection.name} are up to date")
+
+
+async def report_index_builds(collection) -> List[dict]:
+    """Log and return index builds currently running on the collection"""
+    namespace = f"{collection.database.name}.{collection.name}"
+    pipeline = [
+        {"$currentOp": {"allUsers": True, "idleConnections": False}},
+        {"$match": {"ns": namespace, "command.createIndexes": {"$exists": True}}},
+    ]
+    try:
+        admin = collection.database.client.admin
+        operations = await admin.aggregate(pipeline).to_list(None)
+    except Exception as e:
+        logger.debug(f"Cannot inspect running index builds: {e}")
+        return []
+
+    for operation in operations:
+        indexes = [index.get("name") for index in operation["command"].get("indexes", [])]
+        progress = operation.get("progress", {})
+        done, total = progress.get("done"), progress.get("total")
+        status = f"{done}/{total}" if total else operation.get("msg", "running")
+        logger.info(f"Index build in progress on {namespace}: {', '.join(indexes)} ({status})")
+    return operations
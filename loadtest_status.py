@@ -0,0 +1,66 @@
+"""
+Load test for GET /video-status/{id}: many concurrent pollers, latency percentiles
+
+Run it against the API before and after a change to compare p99 latency.
+Requires httpx (pip install httpx).
+
+Usage: python loadtest_status.py VIDEO_ID [--url http://localhost:8000] [--pollers 1000] [--duration 30]
+"""
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+
+async def poller(client, path, deadline, latencies, errors):
+    """Poll path back to back until deadline, recording each request's latency"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("video_id")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pollers", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--path", default="/video-status/{id}")
+    args = parser.parse_args()
+
+    path = args.path.format(id=args.video_id)
+    limits = httpx.Limits(max_connections=args.pollers, max_keepalive_connections=args.pollers)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            poller(client, path, deadline, latencies, errors) for _ in range(args.pollers)
+        ))
+
+    if not latencies:
+        print(f"No successful requests ({len(errors)} errors)")
+        return
+    latencies.sort()
+    print(f"pollers:   {args.pollers}")
+    print(f"requests:  {len(latencies)} ok, {len(errors)} errors")
+    print(f"rate:      {len(latencies) / args.duration:.0f} req/s")
+    print(f"mean:      {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 90, 99, 99.9):
+        print(f"p{pct:<8} {percentile(latencies, pct) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
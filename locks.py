@@ -0,0 +1,102 @@
+import os
+import uuid
+import logging
+import threading
+import redis
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables
+PROCESSING_LEASE_SECONDS = float(os.getenv("PROCESSING_LEASE_SECONDS", "30"))
+
+# Extend the lease only if this holder still owns it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete the lease only if this holder still owns it, so a holder whose
+# lease already expired cannot free a lease taken over by another worker
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def lease_key(video_id: str) -> str:
+    """Redis key of a video's processing lease"""
+    return f"video_lease:{video_id}"
+
+
+class VideoLease:
+    """
+    Expiring lock on one video, held while a worker processes it.
+
+    The lease is a Redis key set with NX and a TTL, valued with a random
+    token. While it is held a heartbeat thread renews the TTL every third
+    of the lease, so a long ffmpeg run keeps it but a crashed worker's
+    lease runs out and the video can be taken over. Renewal and release
+    compare the token first, in Lua, so they never touch someone else's
+    lease
+    """
+
+    def __init__(self, redis_client: redis.Redis, video_id: str, seconds: float = PROCESSING_LEASE_SECONDS):
+        self.redis = redis_client
+        self.key = lease_key(video_id)
+        self.token = uuid.uuid4().hex
+        self.ttl_ms = int(seconds * 1000)
+        self.lost = False
+        self._renew = redis_client.register_script(RENEW_SCRIPT)
+        self._release = redis_client.register_script(RELEASE_SCRIPT)
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """Take the lease and start renewing it; False if another worker holds it"""
+        if not self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms):
+            return False
+        self._heartbeat = threading.Thread(target=self._renew_loop, name=f"heartbeat {self.key}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew_loop(self):
+        """Heartbeat: extend the lease until released or lost"""
+        while not self._stop.wait(self.ttl_ms / 3000):
+            if not self.held():
+                return
+
+    def held(self) -> bool:
+        """
+        Extend the lease now and report whether this holder still owns it.
+        Call before writing results so a holder whose lease expired (e.g.
+        while the process was stalled) stops instead of overwriting the
+        worker that took over. A Redis error is not proof of loss, and no
+        other worker can take the lease over while Redis is unreachable
+        """
+        if self.lost:
+            return False
+        try:
+            if not self._renew(keys=[self.key], args=[self.token, self.ttl_ms]):
+                logger.warning(f"Processing lease {self.key} expired and was lost")
+                self.lost = True
+        except redis.RedisError as e:
+            logger.warning(f"Failed to renew processing lease {self.key}: {e}")
+        return not self.lost
+
+    def release(self):
+        """Stop the heartbeat and delete the lease if this holder still owns it"""
+        if self._heartbeat is None:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+        try:
+            self._release(keys=[self.key], args=[self.token])
+        except redis.RedisError as e:
+            # The lease expires on its own
+            logger.warning(f"Failed to release processing lease {self.key}: {e}")
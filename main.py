@@ -1,30 +1,65 @@
 import os
 import uuid
+import json
+import base64
+import hashlib
 from datetime import datetime
-from typing import Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
-from fastapi.responses import JSONResponse
+from typing import Callable, Dict, List, Optional
+from fastapi import (
+    FastAPI, File, UploadFile, HTTPException, Header, Query, Request, Response,
+    WebSocket, WebSocketDisconnect, status
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import MongoClient
-from celery import Celery
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from celery import Celery, group
+import redis.asyncio as aioredis
 import asyncio
-import aiofiles
 from bson import ObjectId
 from pydantic import BaseModel
 import logging
+from urllib.parse import unquote
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from upload_engine import upload_engine, UploadInterrupted, UploadLimitExceeded
+from resumable import ResumableUploadStore, UPLOAD_SESSION_TTL
+from indexes import ensure_indexes
+from cache import (
+    CACHED_PROJECTION, MEDIA_FIELDS, MISSING, VIDEO_CACHE_NEGATIVE_TTL, VIDEO_CACHE_TTL,
+    decode_video, encode_video, video_cache_key
+)
+from events import EventBroker, UpdateBatcher, format_sse, queue_listener
+from sniff import is_video, peek_stream, read_head, read_file_head, SNIFF_BYTES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Environment variables
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "500"))
+BATCH_LOOKUP_MAX_IDS = int(os.getenv("BATCH_LOOKUP_MAX_IDS", "1000"))
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "50"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "32"))
+STATUS_WAIT_MAX_SECONDS = float(os.getenv("STATUS_WAIT_MAX_SECONDS", "60"))
+WS_TICK_SECONDS = float(os.getenv("WS_TICK_SECONDS", "0.25"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+WS_MAX_SUBSCRIPTIONS = int(os.getenv("WS_MAX_SUBSCRIPTIONS", "1000"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024 * 1024)))
+UPLOAD_SWEEP_INTERVAL_SECONDS = float(os.getenv("UPLOAD_SWEEP_INTERVAL_SECONDS", "300"))
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", "./thumbnails")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "clipo_ai")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "videos")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+MONGODB_TIMEOUT_MS = int(os.getenv("MONGODB_TIMEOUT_MS", "5000"))
 
 # Create directories
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -49,15 +84,16 @@ app.add_middleware(
 # Serve static files
 app.mount("/thumbnails", StaticFiles(directory=THUMBNAIL_DIR), name="thumbnails")
 
-# MongoDB connection
-try:
-    mongo_client = MongoClient(MONGODB_URL)
-    db = mongo_client[DATABASE_NAME]
-    videos_collection = db[COLLECTION_NAME]
-    logger.info("Connected to MongoDB successfully")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    raise
+# MongoDB connection (opened and closed by the lifecycle hooks below)
+mongo_client: Optional[AsyncIOMotorClient] = None
+videos_collection = None
+index_provisioning: Optional[asyncio.Task] = None
+upload_sweeper: Optional[asyncio.Task] = None
+
+# Redis connection
+redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+upload_sessions = ResumableUploadStore(redis_client)
+event_broker = EventBroker(redis_client)
 
 # Celery configuration
 celery_app = Celery(
@@ -87,12 +123,122 @@ class VideoMetadata(BaseModel):
     status: str
     duration: Optional[str] = None
     thumbnail_url: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    video_codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    frame_rate: Optional[float] = None
+    bit_rate: Optional[int] = None
+    rotation: Optional[int] = None
+    audio_codec: Optional[str] = None
+    audio_channels: Optional[int] = None
+    audio_channel_layout: Optional[str] = None
+    audio_sample_rate: Optional[int] = None
 
 class UploadResponse(BaseModel):
     id: str
     filename: str
     message: str
 
+class BatchUploadItem(BaseModel):
+    filename: str
+    id: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    videos: List[BatchUploadItem]
+
+class VideoBatchRequest(BaseModel):
+    ids: List[str]
+
+class VideoStatusBatchResponse(BaseModel):
+    videos: List[VideoStatus]
+    not_found: List[str]
+    invalid: List[str]
+
+class VideoMetadataBatchResponse(BaseModel):
+    videos: List[VideoMetadata]
+    not_found: List[str]
+    invalid: List[str]
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    offset: int
+    size: int
+    expires_in: int
+
+# Lifecycle hooks
+@app.on_event("startup")
+async def connect_mongodb():
+    """Open the async MongoDB client, warm up its pool and ensure indexes"""
+    global mongo_client, videos_collection
+    try:
+        mongo_client = AsyncIOMotorClient(
+            MONGODB_URL,
+            maxPoolSize=MONGODB_MAX_POOL_SIZE,
+            minPoolSize=MONGODB_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGODB_TIMEOUT_MS,
+            connectTimeoutMS=MONGODB_TIMEOUT_MS,
+            socketTimeoutMS=MONGODB_TIMEOUT_MS * 2,
+            waitQueueTimeoutMS=MONGODB_TIMEOUT_MS
+        )
+        await mongo_client.admin.command("ping")
+        videos_collection = mongo_client[DATABASE_NAME][COLLECTION_NAME]
+        logger.info("Connected to MongoDB successfully")
+    except Exception as e:
+        logger.error(f"Failed to connect to MongoDB: {e}")
+        raise
+    
+    # Index builds can take a while on a large collection, so they run in
+    # the background instead of holding up startup
+    global index_provisioning
+    index_provisioning = asyncio.create_task(provision_indexes())
+    
+    event_broker.start()
+    
+    global upload_sweeper
+    upload_sweeper = asyncio.create_task(sweep_upload_sessions())
+
+async def provision_indexes():
+    """Reconcile the videos collection indexes"""
+    try:
+        await ensure_indexes(videos_collection)
+    except Exception as e:
+        logger.error(f"Failed to provision indexes: {e}")
+
+async def sweep_upload_sessions():
+    """
+    Periodically delete the files of resumable uploads whose session
+    expired before they were finalized
+    """
+    while True:
+        await asyncio.sleep(UPLOAD_SWEEP_INTERVAL_SECONDS)
+        try:
+            for file_path in await upload_sessions.take_expired():
+                try:
+                    await asyncio.to_thread(os.remove, file_path)
+                    logger.info(f"Removed abandoned upload: {file_path}")
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            logger.warning(f"Failed to sweep expired upload sessions: {e}")
+
+@app.on_event("shutdown")
+async def close_connections():
+    """Close MongoDB and Redis connections"""
+    if upload_sweeper is not None:
+        upload_sweeper.cancel()
+    await event_broker.stop()
+    if mongo_client is not None:
+        mongo_client.close()
+    await redis_client.close()
+
 # Helper functions
 def serialize_video_doc(doc):
     """Convert MongoDB document to JSON serializable format"""
@@ -101,11 +247,564 @@ def serialize_video_doc(doc):
         del doc["_id"]
     return doc
 
-async def save_upload_file(upload_file: UploadFile, destination: str):
+async def get_video_doc(video_id: str) -> Optional[dict]:
+    """
+    Read-through cached lookup of the fields served by the status and
+    metadata endpoints. The worker writes new states through to the cache;
+    entries are only added here if absent so a slow read cannot overwrite them
+    """
+    key = video_cache_key(video_id)
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return decode_video(cached)
+    except Exception as e:
+        logger.warning(f"Video cache unavailable: {e}")
+        return await videos_collection.find_one({"_id": ObjectId(video_id)}, CACHED_PROJECTION)
+    
+    video_doc = await videos_collection.find_one({"_id": ObjectId(video_id)}, CACHED_PROJECTION)
+    try:
+        if video_doc:
+            await redis_client.set(key, encode_video(video_doc), ex=VIDEO_CACHE_TTL, nx=True)
+        else:
+            await redis_client.set(key, MISSING, ex=VIDEO_CACHE_NEGATIVE_TTL, nx=True)
+    except Exception as e:
+        logger.warning(f"Failed to populate video cache: {e}")
+    return video_doc
+
+async def get_video_docs(video_ids: List[str]) -> Dict[str, dict]:
+    """
+    Batched get_video_doc: one MGET against the cache and a single $in query
+    for the misses. IDs that do not exist are absent from the result
+    """
+    try:
+        cached = await redis_client.mget([video_cache_key(video_id) for video_id in video_ids])
+    except Exception as e:
+        logger.warning(f"Video cache unavailable: {e}")
+        return await find_videos(video_ids, CACHED_PROJECTION)
+    
+    video_docs = {}
+    misses = []
+    for video_id, value in zip(video_ids, cached):
+        if value is None:
+            misses.append(video_id)
+        elif value != MISSING:
+            video_docs[video_id] = decode_video(value)
+    if not misses:
+        return video_docs
+    
+    found = await find_videos(misses, CACHED_PROJECTION)
+    video_docs.update(found)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for video_id in misses:
+            if video_id in found:
+                pipe.set(video_cache_key(video_id), encode_video(found[video_id]), ex=VIDEO_CACHE_TTL, nx=True)
+            else:
+                pipe.set(video_cache_key(video_id), MISSING, ex=VIDEO_CACHE_NEGATIVE_TTL, nx=True)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to populate video cache: {e}")
+    return video_docs
+
+def split_video_ids(video_ids: List[str]):
+    """Deduplicate requested IDs and separate the malformed ones"""
+    if len(video_ids) > BATCH_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_LOOKUP_MAX_IDS} IDs per request"
+        )
+    video_ids = list(dict.fromkeys(video_ids))
+    valid = [video_id for video_id in video_ids if ObjectId.is_valid(video_id)]
+    invalid = [video_id for video_id in video_ids if not ObjectId.is_valid(video_id)]
+    return valid, invalid
+
+def video_metadata(video_id: str, video_doc: dict) -> VideoMetadata:
+    """Build the metadata response for a video document"""
+    # Prepare thumbnail URL if available
+    thumbnail_url = None
+    if video_doc.get("thumbnail_filename"):
+        thumbnail_url = f"/thumbnails/{video_doc['thumbnail_filename']}"
+    
+    return VideoMetadata(
+        id=video_id,
+        filename=video_doc["filename"],
+        upload_time=video_doc["upload_time"],
+        status=video_doc["status"],
+        duration=video_doc.get("duration"),
+        thumbnail_url=thumbnail_url,
+        **{field: video_doc.get(field) for field in MEDIA_FIELDS}
+    )
+
+def video_etag(video_id: str, version: int) -> str:
+    """ETag of a video's status; changes whenever the worker updates the video"""
+    return f'"{video_id}-{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def wait_for_version(queue: asyncio.Queue, version: int, timeout: float) -> Optional[dict]:
+    """Wait for an event carrying a newer version than the given one; None on timeout"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None
+        try:
+            event = await asyncio.wait_for(queue.get(), remaining)
+        except asyncio.TimeoutError:
+            return None
+        if event.get("version", -1) > version:
+            return event
+
+def encode_page_token(doc: dict) -> str:
+    """Opaque /videos/ continuation token for the position after doc"""
+    position = json.dumps([doc["upload_time"], str(doc["_id"])])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+def decode_page_token(token: str) -> dict:
+    """Turn a continuation token into the keyset filter for the next page"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        upload_time, video_id = json.loads(base64.urlsafe_b64decode(padded))
+        video_id = ObjectId(video_id)
+        # upload_time goes into the query as is, so it must not be an operator document
+        if not isinstance(upload_time, str):
+            raise ValueError("upload_time must be a string")
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid page token"
+        )
+    return {"$or": [
+        {"upload_time": {"$lt": upload_time}},
+        {"upload_time": upload_time, "_id": {"$lt": video_id}}
+    ]}
+
+def list_projection(fields: Optional[str]) -> Optional[dict]:
+    """MongoDB projection for a comma-separated /videos/ fields parameter"""
+    if not fields:
+        return None
+    projection = {field.strip(): 1 for field in fields.split(",") if field.strip() and field.strip() != "id"}
+    for field in projection:
+        # Field names go to MongoDB as projection paths: no operators, no
+        # empty path segments and no field together with one of its subfields
+        if any(not part or part.startswith("$") or "\0" in part for part in field.split(".")) \
+                or any(other.startswith(field + ".") or field.startswith(other + ".")
+                       for other in [*projection, "upload_time"]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid field: {field}"
+            )
+    # The sort keys are always needed to build the next page token
+    projection["upload_time"] = 1
+    return projection
+
+async def stream_videos_ndjson(query: dict, projection: Optional[dict], drop_upload_time: bool):
+    """Yield the matching videos as NDJSON, one cursor batch per chunk"""
+    cursor = videos_collection.find(query, projection, batch_size=EXPORT_BATCH_SIZE) \
+        .sort([("upload_time", -1), ("_id", -1)])
+    try:
+        while videos := await cursor.to_list(EXPORT_BATCH_SIZE):
+            lines = []
+            for video in videos:
+                if drop_upload_time:
+                    del video["upload_time"]
+                lines.append(json.dumps(serialize_video_doc(video), default=str))
+            yield "\n".join(lines) + "\n"
+    finally:
+        await cursor.close()
+
+async def stream_video_events(queue: asyncio.Queue, initial: Optional[dict] = None):
+    """Yield Server-Sent Events from a subscribed queue until the client leaves"""
+    if initial:
+        yield format_sse(initial)
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            # Comment line keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            continue
+        yield format_sse(event)
+
+def event_stream_response(queue: asyncio.Queue, unsubscribe: Callable[[], None],
+                          initial: Optional[dict] = None) -> StreamingResponse:
+    """
+    SSE response for a subscription. The listener is removed once the
+    response ends, even if the client leaves before the stream starts
+    """
+    return StreamingResponse(
+        stream_video_events(queue, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(unsubscribe)
+    )
+
+async def find_videos(video_ids: List[str], projection: dict) -> Dict[str, dict]:
+    """Fetch many videos with a single $in query, keyed by ID"""
+    cursor = videos_collection.find(
+        {"_id": {"$in": [ObjectId(video_id) for video_id in video_ids]}},
+        projection
+    )
+    return {str(doc["_id"]): doc async for doc in cursor}
+
+async def close_websocket(websocket: WebSocket, code: int):
+    """Close a WebSocket without failing if the client is already gone"""
+    try:
+        await asyncio.wait_for(websocket.close(code=code), WS_SEND_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, RuntimeError):
+        pass
+
+async def subscribe_videos(video_ids: List[str], batcher: UpdateBatcher,
+                           subscriptions: Dict[str, Callable[[], None]]):
+    """Subscribe a connection to videos and queue their current status"""
+    new_ids = []
+    for video_id in video_ids:
+        if video_id in subscriptions:
+            continue
+        if not ObjectId.is_valid(video_id):
+            batcher({"id": video_id, "error": "invalid_id"})
+        elif len(subscriptions) >= WS_MAX_SUBSCRIPTIONS:
+            batcher({"id": video_id, "error": "subscription_limit"})
+        else:
+            # Listen before reading the current status so no change is missed
+            subscriptions[video_id] = event_broker.subscribe(video_id, batcher)
+            new_ids.append(video_id)
+    
+    if not new_ids:
+        return
+    video_docs = await find_videos(new_ids, {"status": 1})
+    for video_id in new_ids:
+        video_doc = video_docs.get(video_id)
+        if video_doc is None:
+            subscriptions.pop(video_id)()
+            batcher({"id": video_id, "error": "not_found"})
+        elif video_id not in batcher.pending:
+            batcher({"id": video_id, "status": video_doc["status"]})
+
+async def receive_subscriptions(websocket: WebSocket, batcher: UpdateBatcher,
+                                subscriptions: Dict[str, Callable[[], None]]):
+    """Apply subscribe/unsubscribe messages until the client disconnects"""
+    try:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action") if isinstance(message, dict) else None
+            video_ids = message.get("ids") if isinstance(message, dict) else None
+            if action not in ("subscribe", "unsubscribe") or not isinstance(video_ids, list):
+                await close_websocket(websocket, status.WS_1003_UNSUPPORTED_DATA)
+                return
+            video_ids = [str(video_id) for video_id in video_ids]
+            
+            if action == "subscribe":
+                await subscribe_videos(video_ids, batcher, subscriptions)
+            else:
+                for video_id in video_ids:
+                    unsubscribe = subscriptions.pop(video_id, None)
+                    if unsubscribe:
+                        unsubscribe()
+                    batcher.discard(video_id)
+    except WebSocketDisconnect:
+        pass
+    except ValueError:
+        await close_websocket(websocket, status.WS_1003_UNSUPPORTED_DATA)
+    except Exception as e:
+        logger.error(f"Error handling video subscriptions: {e}")
+        await close_websocket(websocket, status.WS_1011_INTERNAL_ERROR)
+
+async def send_video_updates(websocket: WebSocket, batcher: UpdateBatcher):
+    """
+    Push coalesced updates at most once per tick. Updates for a client that
+    is slow to read pile up in the batcher, one entry per video; a client
+    that cannot take a batch within the send timeout is disconnected
+    """
+    while True:
+        videos = await batcher.next_batch(WS_TICK_SECONDS)
+        try:
+            await asyncio.wait_for(
+                websocket.send_json({"type": "updates", "videos": videos}),
+                WS_SEND_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Closing video updates WebSocket: client is not reading")
+            await close_websocket(websocket, status.WS_1013_TRY_AGAIN_LATER)
+            return
+        except (WebSocketDisconnect, RuntimeError):
+            return
+
+async def save_upload_file(upload_file: UploadFile, destination: str, hasher=None) -> int:
     """Save uploaded file to destination"""
-    async with aiofiles.open(destination, 'wb') as f:
-        while chunk := await upload_file.read(1024):
-            await f.write(chunk)
+    return await upload_engine.save(upload_file.file, destination, upload_file.size, hasher)
+
+def remove_if_exists(file_path: str):
+    """Delete a file, ignoring one that was never created"""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+def new_content_hasher():
+    """Streaming hash used to content-address uploads"""
+    return hashlib.blake2b(digest_size=32)
+
+def hash_file(file_path: str) -> str:
+    """Content hash of a file already on disk; blocking, run it in a worker thread"""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, new_content_hasher).hexdigest()
+
+async def find_processed_video(content_hash: str) -> Optional[dict]:
+    """Return the finished video that owns content_hash, if there is one"""
+    original = await videos_collection.find_one({"content_hash": content_hash})
+    if original and original["status"] == "done":
+        return original
+    return None
+
+async def release_failed_hashes(hashes: List[str]) -> int:
+    """
+    Take content hashes away from records whose processing failed, so a new
+    upload of the same content can own them and become the dedup source.
+    Returns the number of hashes released
+    """
+    result = await videos_collection.update_many(
+        {"content_hash": {"$in": hashes}, "status": "failed"},
+        {"$unset": {"content_hash": ""}}
+    )
+    return result.modified_count
+
+async def insert_owning_hashes(video_docs: List[dict]) -> List[dict]:
+    """
+    insert_many the documents unordered and return those rejected because
+    another record owns their content hash
+    """
+    try:
+        await videos_collection.insert_many(video_docs, ordered=False)
+    except BulkWriteError as e:
+        rejected = [video_docs[error["index"]] for error in e.details["writeErrors"] if error["code"] == 11000]
+        if len(rejected) != len(e.details["writeErrors"]):
+            raise
+        return rejected
+    return []
+
+def new_video_doc(filename: str, stored_filename: str, file_path: str) -> dict:
+    """Initial record for a freshly uploaded video"""
+    return {
+        "filename": filename,
+        "stored_filename": stored_filename,
+        "file_path": file_path,
+        "upload_time": datetime.utcnow().isoformat(),
+        "status": "pending",
+        "version": 0,
+        "duration": None,
+        "thumbnail_url": None
+    }
+
+def duplicate_video_doc(filename: str, original: dict) -> dict:
+    """Finished record that reuses the file and results of original"""
+    now = datetime.utcnow().isoformat()
+    return {
+        "filename": filename,
+        "stored_filename": original["stored_filename"],
+        "file_path": original["file_path"],
+        "upload_time": now,
+        "status": "done",
+        "version": 0,
+        "duration": original.get("duration"),
+        "thumbnail_url": None,
+        "thumbnail_filename": original.get("thumbnail_filename"),
+        "duplicate_of": str(original["_id"]),
+        "processed_time": now,
+        **{field: original.get(field) for field in MEDIA_FIELDS}
+    }
+
+async def register_duplicate(filename: str, original: dict) -> str:
+    """Insert a finished record that reuses the file and results of original"""
+    result = await videos_collection.insert_one(duplicate_video_doc(filename, original))
+    return str(result.inserted_id)
+
+async def register_video(filename: str, stored_filename: str, file_path: str,
+                   content_hash: Optional[str] = None) -> str:
+    """Insert the initial video record and start background processing"""
+    video_doc = new_video_doc(filename, stored_filename, file_path)
+    
+    if content_hash:
+        video_doc["content_hash"] = content_hash
+    try:
+        result = await videos_collection.insert_one(video_doc)
+    except DuplicateKeyError:
+        result = None
+        # A failed owner gives its hash up to this record
+        if await release_failed_hashes([content_hash]):
+            try:
+                result = await videos_collection.insert_one(video_doc)
+            except DuplicateKeyError:
+                pass
+        if result is None:
+            # Another record already owns this content but has not finished
+            # processing it; process this copy independently
+            video_doc.pop("content_hash")
+            video_doc.pop("_id", None)
+            result = await videos_collection.insert_one(video_doc)
+    video_id = str(result.inserted_id)
+    
+    # Trigger Celery background processing
+    from tasks import processing_pipeline
+    task = await asyncio.to_thread(processing_pipeline(video_id, file_path, stored_filename).apply_async)
+    
+    # Update document with task ID
+    await videos_collection.update_one(
+        {"_id": result.inserted_id},
+        {"$set": {"task_id": task.id}}
+    )
+    
+    return video_id
+
+async def register_videos(uploads: List[dict]) -> List[dict]:
+    """
+    Register a batch of written uploads with a single insert_many and queue
+    their processing as one Celery group. Returns the inserted documents
+    """
+    # Look up already processed content for the whole batch in one query
+    hashes = [upload["content_hash"] for upload in uploads]
+    originals = {
+        doc["content_hash"]: doc
+        async for doc in videos_collection.find({"content_hash": {"$in": hashes}, "status": "done"})
+    }
+    
+    # IDs are assigned up front so each document can be inserted together
+    # with the ID of the task that will process it
+    video_docs = []
+    for upload in uploads:
+        original = originals.get(upload["content_hash"])
+        if original:
+            video_doc = duplicate_video_doc(upload["filename"], original)
+        else:
+            video_doc = new_video_doc(upload["filename"], upload["stored_filename"], upload["file_path"])
+            video_doc["content_hash"] = upload["content_hash"]
+            video_doc["task_id"] = str(uuid.uuid4())
+        video_doc["_id"] = ObjectId()
+        video_docs.append(video_doc)
+    
+    rejected = await insert_owning_hashes(video_docs)
+    # Failed owners give their hashes up to this batch
+    if rejected and await release_failed_hashes([video_doc["content_hash"] for video_doc in rejected]):
+        rejected = await insert_owning_hashes(rejected)
+    if rejected:
+        # Content owned by an unfinished record (or repeated within the
+        # batch) is processed independently, as in register_video
+        for video_doc in rejected:
+            video_doc.pop("content_hash")
+        await videos_collection.insert_many(rejected)
+    
+    # Trigger Celery background processing
+    from tasks import processing_pipeline
+    pending = [video_doc for video_doc in video_docs if video_doc["status"] == "pending"]
+    if pending:
+        await asyncio.to_thread(group(
+            processing_pipeline(
+                str(video_doc["_id"]), video_doc["file_path"], video_doc["stored_filename"],
+                task_id=video_doc["task_id"]
+            )
+            for video_doc in pending
+        ).apply_async)
+    
+    return video_docs
+
+async def complete_upload(filename: str, stored_filename: str, file_path: str,
+                          content_hash: str) -> UploadResponse:
+    """Register a fully written upload, reusing earlier results for known content"""
+    original = await find_processed_video(content_hash)
+    if original:
+        video_id = await register_duplicate(filename, original)
+        await asyncio.to_thread(os.remove, file_path)
+        
+        logger.info(f"Duplicate upload of {original['stored_filename']}, ID: {video_id}")
+        
+        return UploadResponse(
+            id=video_id,
+            filename=filename,
+            message="Video already processed. Reusing existing results."
+        )
+    
+    # Insert initial record to MongoDB and trigger processing
+    video_id = await register_video(filename, stored_filename, file_path, content_hash)
+    
+    logger.info(f"Video uploaded successfully: {stored_filename}, ID: {video_id}")
+    
+    return UploadResponse(
+        id=video_id,
+        filename=filename,
+        message="Video uploaded successfully. Processing started."
+    )
+
+async def store_batch_file(file: UploadFile) -> dict:
+    """Validate and save one file of a batch upload, hashing it on the way"""
+    if not file.content_type or not file.content_type.startswith('video/'):
+        return {"filename": file.filename, "error": "Only video files are allowed"}
+    
+    head = await asyncio.to_thread(read_head, file.file)
+    if not await is_video(head):
+        return {"filename": file.filename, "error": unsupported_media_type().detail}
+    
+    file_extension = os.path.splitext(file.filename)[1]
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    
+    hasher = new_content_hasher()
+    try:
+        await save_upload_file(file, file_path, hasher)
+    except Exception as e:
+        # One failed write must not fail the rest of the batch
+        logger.error(f"Error saving batch file {file.filename}: {e}")
+        await asyncio.to_thread(remove_if_exists, file_path)
+        return {"filename": file.filename, "error": f"Failed to save file: {str(e)}"}
+    
+    return {
+        "filename": file.filename,
+        "stored_filename": unique_filename,
+        "file_path": file_path,
+        "content_hash": hasher.hexdigest()
+    }
+
+async def get_upload_session(upload_id: str) -> dict:
+    """Load a resumable upload session or raise 404"""
+    session = await upload_sessions.get(upload_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found or expired"
+        )
+    return session
+
+async def sniff_upload_session(upload_id: str, session: dict):
+    """
+    Check the head of a resumable upload's file; if it is not a video,
+    abort the whole upload and raise 415
+    """
+    head = await asyncio.to_thread(read_file_head, session["file_path"], min(SNIFF_BYTES, session["size"]))
+    if not await is_video(head):
+        await upload_sessions.delete(upload_id)
+        await asyncio.to_thread(os.remove, session["file_path"])
+        raise unsupported_media_type()
+    await upload_sessions.mark_sniffed(upload_id)
+
+def upload_too_large() -> HTTPException:
+    """Error raised when an upload declares or sends more than UPLOAD_MAX_BYTES"""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the maximum size of {UPLOAD_MAX_BYTES} bytes"
+    )
+
+def unsupported_media_type() -> HTTPException:
+    """Error raised when upload content is not a video container"""
+    return HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Uploaded file is not a recognised video format"
+    )
 
 # API Endpoints
 @app.get("/")
@@ -126,60 +825,342 @@ async def upload_video(file: UploadFile = File(...)):
                 detail="Only video files are allowed"
             )
         
+        # Check the container signature before copying the body
+        head = await asyncio.to_thread(read_head, file.file)
+        if not await is_video(head):
+            raise unsupported_media_type()
+        
         # Generate unique filename
         file_extension = os.path.splitext(file.filename)[1]
         unique_filename = f"{uuid.uuid4()}{file_extension}"
         file_path = os.path.join(UPLOAD_DIR, unique_filename)
         
-        # Save file
-        await save_upload_file(file, file_path)
-        
-        # Insert initial record to MongoDB
-        video_doc = {
-            "filename": file.filename,
-            "stored_filename": unique_filename,
-            "file_path": file_path,
-            "upload_time": datetime.utcnow().isoformat(),
-            "status": "pending",
-            "duration": None,
-            "thumbnail_url": None
-        }
-        
-        result = videos_collection.insert_one(video_doc)
-        video_id = str(result.inserted_id)
-        
-        # Trigger Celery background task
-        from tasks import process_video
-        task = process_video.delay(video_id, file_path, unique_filename)
-        
-        # Update document with task ID
-        videos_collection.update_one(
-            {"_id": result.inserted_id},
-            {"$set": {"task_id": task.id}}
+        # Save file, hashing it on the way to disk
+        hasher = new_content_hasher()
+        await save_upload_file(file, file_path, hasher)
+        content_hash = hasher.hexdigest()
+        
+        return await complete_upload(file.filename, unique_filename, file_path, content_hash)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading video: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload video: {str(e)}"
         )
+
+@app.post("/upload-videos/", response_model=BatchUploadResponse)
+async def upload_videos(files: List[UploadFile] = File(...)):
+    """
+    Upload several video files in one request and start background processing.
+    Files are validated individually; rejected files are reported per file
+    """
+    try:
+        if len(files) > BATCH_UPLOAD_MAX_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {BATCH_UPLOAD_MAX_FILES} files per batch"
+            )
         
-        logger.info(f"Video uploaded successfully: {unique_filename}, ID: {video_id}")
+        # Write all files concurrently
+        results = await asyncio.gather(*(store_batch_file(file) for file in files))
+        stored = [result for result in results if "error" not in result]
         
-        return UploadResponse(
-            id=video_id,
-            filename=file.filename,
-            message="Video uploaded successfully. Processing started."
+        try:
+            video_docs = iter(await register_videos(stored) if stored else [])
+        except Exception:
+            # Nothing will reference the written files
+            for result in stored:
+                await asyncio.to_thread(remove_if_exists, result["file_path"])
+            raise
+        items = []
+        for result in results:
+            if "error" in result:
+                items.append(BatchUploadItem(filename=result["filename"], error=result["error"]))
+                continue
+            video_doc = next(video_docs)
+            if video_doc["status"] == "done":
+                # Duplicate of processed content: the new copy is not needed
+                await asyncio.to_thread(os.remove, result["file_path"])
+                message = "Video already processed. Reusing existing results."
+            else:
+                message = "Video uploaded successfully. Processing started."
+            items.append(BatchUploadItem(filename=result["filename"], id=str(video_doc["_id"]), message=message))
+        
+        logger.info(f"Batch upload: {len(stored)} of {len(files)} files accepted")
+        
+        return BatchUploadResponse(videos=items)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading video batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload videos: {str(e)}"
         )
+
+@app.put("/videos/raw", response_model=UploadResponse)
+async def upload_video_raw(
+    request: Request,
+    x_filename: str = Header(..., alias="X-Filename"),
+    x_content_type: str = Header(..., alias="X-Content-Type"),
+    content_length: Optional[int] = Header(None, alias="Content-Length")
+):
+    """
+    Upload a video as a raw application/octet-stream body. The body is
+    streamed straight into UPLOAD_DIR without multipart spooling
+    """
+    file_path = None
+    try:
+        filename = unquote(x_filename)
+        if not x_content_type.startswith('video/'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only video files are allowed"
+            )
+        if content_length is not None and content_length > UPLOAD_MAX_BYTES:
+            raise upload_too_large()
+        
+        # Check the container signature before writing anything
+        head, body = await peek_stream(request.stream(), SNIFF_BYTES)
+        if not await is_video(head):
+            raise unsupported_media_type()
+        
+        # Generate unique filename
+        file_extension = os.path.splitext(filename)[1]
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        file_path = os.path.join(UPLOAD_DIR, unique_filename)
+        
+        # Stream the body into its final location, hashing it on the way
+        hasher = new_content_hasher()
+        await asyncio.to_thread(upload_engine.create_file, file_path, content_length or 0)
+        try:
+            written = await upload_engine.write_stream(
+                body, file_path, limit=content_length or UPLOAD_MAX_BYTES, hasher=hasher
+            )
+        except UploadLimitExceeded:
+            if content_length is None:
+                raise upload_too_large()
+            raise
+        if content_length is not None and written != content_length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Body ended after {written} of {content_length} bytes"
+            )
+        
+        response = await complete_upload(filename, unique_filename, file_path, hasher.hexdigest())
+        file_path = None
+        return response
         
     except HTTPException:
         raise
+    except (ClientDisconnect, UploadInterrupted, UploadLimitExceeded):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload body did not match Content-Length"
+        )
     except Exception as e:
-        logger.error(f"Error uploading video: {e}")
+        logger.error(f"Error uploading raw video: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload video: {str(e)}"
         )
+    finally:
+        # Remove partially written files
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+@app.post("/uploads/", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(session: UploadSessionCreate):
+    """
+    Start a resumable upload. Chunks are then sent with PATCH /uploads/{upload_id}
+    """
+    try:
+        if not session.content_type.startswith('video/'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only video files are allowed"
+            )
+        if session.size <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload size must be positive"
+            )
+        if session.size > UPLOAD_MAX_BYTES:
+            raise upload_too_large()
+        
+        # Generate unique filename and reserve the full file up front
+        file_extension = os.path.splitext(session.filename)[1]
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        file_path = os.path.join(UPLOAD_DIR, unique_filename)
+        await asyncio.to_thread(upload_engine.create_file, file_path, session.size)
+        
+        upload_id = await upload_sessions.create(
+            session.filename, session.content_type, session.size, unique_filename, file_path
+        )
+        
+        logger.info(f"Upload session created: {upload_id}, {session.size} bytes")
+        
+        return UploadSessionResponse(
+            upload_id=upload_id,
+            offset=0,
+            size=session.size,
+            expires_in=UPLOAD_SESSION_TTL
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating upload session: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create upload session: {str(e)}"
+        )
+
+@app.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(upload_id: str, request: Request, upload_offset: int = Header(..., alias="Upload-Offset")):
+    """
+    Write the request body at Upload-Offset. Chunks may be sent in any order
+    and in parallel; the response carries the current contiguous offset
+    """
+    try:
+        session = await get_upload_session(upload_id)
+        if session.get("finalizing"):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload is already being finalized"
+            )
+        if upload_offset < 0 or upload_offset >= session["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload-Offset is outside the file"
+            )
+        
+        interrupted = False
+        try:
+            written = await upload_engine.write_stream(
+                request.stream(),
+                session["file_path"],
+                offset=upload_offset,
+                limit=session["size"] - upload_offset
+            )
+        except UploadLimitExceeded:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Chunk extends past the declared upload size"
+            )
+        except UploadInterrupted as e:
+            # Keep what arrived before the connection dropped, so the client
+            # resumes from there instead of resending the whole chunk
+            written, interrupted = e.written, True
+        
+        if written:
+            await upload_sessions.add_range(upload_id, upload_offset, upload_offset + written)
+        offset, _ = await upload_sessions.received(upload_id)
+        
+        # Check the container signature as soon as the head of the file is
+        # contiguous, whichever chunk completes it
+        if not session.get("sniffed") and offset >= min(SNIFF_BYTES, session["size"]):
+            await sniff_upload_session(upload_id, session)
+        
+        if interrupted:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk ended after {written} bytes; resume from Upload-Offset",
+                headers={"Upload-Offset": str(offset)}
+            )
+        
+        return Response(
+            status_code=status.HTTP_204_NO_CONTENT,
+            headers={"Upload-Offset": str(offset)}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error writing upload chunk: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to write upload chunk: {str(e)}"
+        )
+
+@app.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    """
+    Report how much of a resumable upload has been received
+    """
+    session = await get_upload_session(upload_id)
+    offset, received = await upload_sessions.received(upload_id)
+    return Response(headers={
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(session["size"]),
+        "Upload-Received": str(received),
+        "Cache-Control": "no-store"
+    })
 
-@app.get("/video-status/{video_id}", response_model=VideoStatus)
-async def get_video_status(video_id: str):
+@app.post("/uploads/{upload_id}/finalize", response_model=UploadResponse)
+async def finalize_upload(upload_id: str):
     """
-    Get the current processing status of a video
+    Complete a resumable upload and start background processing
     """
+    try:
+        session = await get_upload_session(upload_id)
+        offset, _ = await upload_sessions.received(upload_id)
+        if offset != session["size"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload incomplete: {offset} of {session['size']} bytes received"
+            )
+        if not await upload_sessions.claim_finalize(upload_id):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload is already being finalized"
+            )
+        if not session.get("sniffed"):
+            await sniff_upload_session(upload_id, session)
+        
+        try:
+            # Chunks arrive out of order, so the file is hashed once it is complete
+            content_hash = await asyncio.to_thread(hash_file, session["file_path"])
+            response = await complete_upload(
+                session["filename"], session["stored_filename"], session["file_path"], content_hash
+            )
+        except Exception:
+            await upload_sessions.release_finalize(upload_id)
+            raise
+        await upload_sessions.delete(upload_id)
+        
+        logger.info(f"Resumable upload finalized: {session['stored_filename']}, ID: {response.id}")
+        
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finalizing upload: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to finalize upload: {str(e)}"
+        )
+
+@app.get("/video-status/{video_id}", response_model=VideoStatus, responses={304: {"description": "Status unchanged"}})
+async def get_video_status(
+    video_id: str,
+    response: Response,
+    wait: float = Query(0, ge=0, le=STATUS_WAIT_MAX_SECONDS),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get the current processing status of a video.
+    
+    Responses carry an ETag; a request whose If-None-Match still matches gets
+    304. With wait=N such a request is held for up to N seconds and answered
+    as soon as the worker publishes a new status
+    """
+    unsubscribe = None
     try:
         # Validate ObjectId
         if not ObjectId.is_valid(video_id):
@@ -188,8 +1169,13 @@ async def get_video_status(video_id: str):
                 detail="Invalid video ID format"
             )
         
-        # Find video in database
-        video_doc = videos_collection.find_one({"_id": ObjectId(video_id)})
+        # Listen before reading the current status so no change is missed
+        if wait and if_none_match:
+            changes = asyncio.Queue(SSE_QUEUE_SIZE)
+            unsubscribe = event_broker.subscribe(video_id, queue_listener(changes))
+        
+        # Find video in cache or database
+        video_doc = await get_video_doc(video_id)
         
         if not video_doc:
             raise HTTPException(
@@ -197,9 +1183,22 @@ async def get_video_status(video_id: str):
                 detail="Video not found"
             )
         
+        version = video_doc.get("version", 0)
+        current_status = video_doc["status"]
+        if etag_matches(if_none_match, video_etag(video_id, version)):
+            event = await wait_for_version(changes, version, wait) if unsubscribe else None
+            if event is None:
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": video_etag(video_id, version), "Cache-Control": "no-cache"}
+                )
+            version, current_status = event["version"], event["status"]
+        
+        response.headers["ETag"] = video_etag(video_id, version)
+        response.headers["Cache-Control"] = "no-cache"
         return VideoStatus(
             id=video_id,
-            status=video_doc["status"]
+            status=current_status
         )
         
     except HTTPException:
@@ -210,6 +1209,94 @@ async def get_video_status(video_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get video status: {str(e)}"
         )
+    finally:
+        if unsubscribe:
+            unsubscribe()
+
+@app.post("/video-status/batch", response_model=VideoStatusBatchResponse)
+async def get_video_status_batch(request: VideoBatchRequest):
+    """
+    Get the processing status of many videos with a single lookup
+    """
+    try:
+        video_ids, invalid = split_video_ids(request.ids)
+        video_docs = await get_video_docs(video_ids) if video_ids else {}
+        
+        return VideoStatusBatchResponse(
+            videos=[
+                VideoStatus(id=video_id, status=video_docs[video_id]["status"])
+                for video_id in video_ids if video_id in video_docs
+            ],
+            not_found=[video_id for video_id in video_ids if video_id not in video_docs],
+            invalid=invalid
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting video statuses: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get video statuses: {str(e)}"
+        )
+
+@app.get("/video-events/")
+async def video_events_firehose():
+    """
+    Server-Sent Events stream of status changes of all videos
+    """
+    queue = asyncio.Queue(SSE_QUEUE_SIZE)
+    unsubscribe = event_broker.subscribe(None, queue_listener(queue))
+    return event_stream_response(queue, unsubscribe)
+
+@app.get("/video-events/{video_id}")
+async def video_events(video_id: str):
+    """
+    Server-Sent Events stream of a video's status changes. The current
+    status is sent first, then every transition as it happens
+    """
+    # Validate ObjectId
+    if not ObjectId.is_valid(video_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid video ID format"
+        )
+    
+    # Listen before reading the current status so no change is missed
+    queue = asyncio.Queue(SSE_QUEUE_SIZE)
+    unsubscribe = event_broker.subscribe(video_id, queue_listener(queue))
+    try:
+        video_doc = await get_video_doc(video_id)
+        if not video_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Video not found"
+            )
+    except Exception:
+        unsubscribe()
+        raise
+    
+    return event_stream_response(queue, unsubscribe, {"id": video_id, "status": video_doc["status"]})
+
+@app.websocket("/ws/videos")
+async def video_updates(websocket: WebSocket):
+    """
+    Track many videos over one connection. Clients send
+    {"action": "subscribe" | "unsubscribe", "ids": [...]} and receive
+    {"type": "updates", "videos": [...]} batches of status and progress
+    """
+    await websocket.accept()
+    batcher = UpdateBatcher()
+    subscriptions = {}
+    receiver = asyncio.create_task(receive_subscriptions(websocket, batcher, subscriptions))
+    sender = asyncio.create_task(send_video_updates(websocket, batcher))
+    try:
+        await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        for unsubscribe in subscriptions.values():
+            unsubscribe()
 
 @app.get("/video-metadata/{video_id}", response_model=VideoMetadata)
 async def get_video_metadata(video_id: str):
@@ -224,8 +1311,8 @@ async def get_video_metadata(video_id: str):
                 detail="Invalid video ID format"
             )
         
-        # Find video in database
-        video_doc = videos_collection.find_one({"_id": ObjectId(video_id)})
+        # Find video in cache or database
+        video_doc = await get_video_doc(video_id)
         
         if not video_doc:
             raise HTTPException(
@@ -233,18 +1320,33 @@ async def get_video_metadata(video_id: str):
                 detail="Video not found"
             )
         
-        # Prepare thumbnail URL if available
-        thumbnail_url = None
-        if video_doc.get("thumbnail_filename"):
-            thumbnail_url = f"/thumbnails/{video_doc['thumbnail_filename']}"
+        return video_metadata(video_id, video_doc)
         
-        return VideoMetadata(
-            id=video_id,
-            filename=video_doc["filename"],
-            upload_time=video_doc["upload_time"],
-            status=video_doc["status"],
-            duration=video_doc.get("duration"),
-            thumbnail_url=thumbnail_url
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting video metadata: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get video metadata: {str(e)}"
+        )
+
+@app.post("/video-metadata/batch", response_model=VideoMetadataBatchResponse)
+async def get_video_metadata_batch(request: VideoBatchRequest):
+    """
+    Get complete metadata for many videos with a single lookup
+    """
+    try:
+        video_ids, invalid = split_video_ids(request.ids)
+        video_docs = await get_video_docs(video_ids) if video_ids else {}
+        
+        return VideoMetadataBatchResponse(
+            videos=[
+                video_metadata(video_id, video_docs[video_id])
+                for video_id in video_ids if video_id in video_docs
+            ],
+            not_found=[video_id for video_id in video_ids if video_id not in video_docs],
+            invalid=invalid
         )
         
     except HTTPException:
@@ -257,15 +1359,49 @@ async def get_video_metadata(video_id: str):
         )
 
 @app.get("/videos/")
-async def list_videos():
+async def list_videos(
+    request: Request,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    page_token: Optional[str] = Query(None, alias="next"),
+    fields: Optional[str] = None
+):
     """
-    List all videos (bonus endpoint for easier testing)
+    List videos, newest first, one page at a time. Pass the returned `next`
+    token to get the following page and `fields` (comma-separated) to
+    return only some fields of each video.
+    
+    With `Accept: application/x-ndjson` every video from the `next`
+    position onwards is streamed instead, one JSON document per line
     """
     try:
-        videos = list(videos_collection.find().sort("upload_time", -1))
+        query = decode_page_token(page_token) if page_token else {}
+        projection = list_projection(fields)
+        drop_upload_time = bool(projection) and "upload_time" not in {field.strip() for field in fields.split(",")}
+        
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                stream_videos_ndjson(query, projection, drop_upload_time),
+                media_type="application/x-ndjson"
+            )
+        
+        # Keyset pagination on (upload_time, _id): every page is an index
+        # range scan, however deep into the listing it is
+        videos = await videos_collection.find(query, projection) \
+            .sort([("upload_time", -1), ("_id", -1)]) \
+            .limit(limit + 1) \
+            .to_list(limit + 1)
+        
+        next_token = encode_page_token(videos[limit - 1]) if len(videos) > limit else None
+        videos = videos[:limit]
+        if drop_upload_time:
+            for video in videos:
+                del video["upload_time"]
+        
         serialized_videos = [serialize_video_doc(video) for video in videos]
-        return {"videos": serialized_videos}
+        return {"videos": serialized_videos, "next": next_token}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing videos: {e}")
         raise HTTPException(
@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+from typing import List, Optional, Tuple
+import redis.asyncio as aioredis
+
+# Environment variables
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+
+
+def _session_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}"
+
+
+def _ranges_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}:ranges"
+
+
+# Sessions by expiry time, and the file each one writes to. These outlive
+# the session keys so files of abandoned uploads can be found and removed
+_EXPIRY_KEY = "upload_sessions:expiry"
+_FILES_KEY = "upload_sessions:files"
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping or adjacent [start, end) byte ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ResumableUploadStore:
+    """
+    Resumable upload session state kept in Redis.
+
+    Each session is a hash with the upload parameters plus a sorted set of the
+    byte ranges that have been written, so chunks may arrive out of order and
+    over several connections at once.
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, ttl: int = UPLOAD_SESSION_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    async def create(self, filename: str, content_type: str, size: int,
+                     stored_filename: str, file_path: str) -> str:
+        """Create a new session and return its upload ID"""
+        upload_id = uuid.uuid4().hex
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(_session_key(upload_id), mapping={
+                "filename": filename,
+                "content_type": content_type,
+                "size": size,
+                "stored_filename": stored_filename,
+                "file_path": file_path,
+            })
+            pipe.expire(_session_key(upload_id), self.ttl)
+            pipe.zadd(_EXPIRY_KEY, {upload_id: time.time() + self.ttl})
+            pipe.hset(_FILES_KEY, upload_id, file_path)
+            await pipe.execute()
+        return upload_id
+
+    async def get(self, upload_id: str) -> Optional[dict]:
+        """Return the session fields, or None if it does not exist or expired"""
+        session = await self.redis.hgetall(_session_key(upload_id))
+        if not session:
+            return None
+        session["size"] = int(session["size"])
+        return session
+
+    async def add_range(self, upload_id: str, start: int, end: int):
+        """Record that bytes [start, end) are on disk and refresh the session TTL"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(_ranges_key(upload_id), {f"{start}-{end}": start})
+            pipe.expire(_ranges_key(upload_id), self.ttl)
+            pipe.expire(_session_key(upload_id), self.ttl)
+            pipe.zadd(_EXPIRY_KEY, {upload_id: time.time() + self.ttl})
+            await pipe.execute()
+
+    async def received(self, upload_id: str) -> Tuple[int, int]:
+        """
+        Return (offset, total): the end of the contiguous range starting at 0,
+        which is where a sequential client should resume, and the number of
+        distinct bytes received
+        """
+        members = await self.redis.zrange(_ranges_key(upload_id), 0, -1)
+        ranges = merge_ranges([tuple(map(int, m.split("-"))) for m in members])
+        offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+        total = sum(end - start for start, end in ranges)
+        return offset, total
+
+    async def claim_finalize(self, upload_id: str) -> bool:
+        """Mark the session as finalizing; False if another request already did"""
+        return bool(await self.redis.hsetnx(_session_key(upload_id), "finalizing", 1))
+
+    async def mark_sniffed(self, upload_id: str):
+        """Record that the head of the file passed the container check"""
+        await self.redis.hset(_session_key(upload_id), "sniffed", 1)
+
+    async def release_finalize(self, upload_id: str):
+        """Undo claim_finalize after a failed finalize so the client can retry"""
+        await self.redis.hdel(_session_key(upload_id), "finalizing")
+
+    async def delete(self, upload_id: str):
+        """Remove all state for a session"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(_session_key(upload_id), _ranges_key(upload_id))
+            pipe.zrem(_EXPIRY_KEY, upload_id)
+            pipe.hdel(_FILES_KEY, upload_id)
+            await pipe.execute()
+
+    async def take_expired(self, limit: int = 100) -> List[str]:
+        """
+        Forget up to limit sessions whose TTL has run out and return the
+        paths of their files for the caller to delete. Each expired session
+        is handed to exactly one caller, even with several API processes
+        """
+        upload_ids = await self.redis.zrangebyscore(_EXPIRY_KEY, 0, time.time(), start=0, num=limit)
+        file_paths = []
+        for upload_id in upload_ids:
+            if await self.redis.exists(_session_key(upload_id)):
+                continue
+            if not await self.redis.zrem(_EXPIRY_KEY, upload_id):
+                continue
+            file_path = await self.redis.hget(_FILES_KEY, upload_id)
+            await self.redis.hdel(_FILES_KEY, upload_id)
+            if file_path:
+                file_paths.append(file_path)
+        return file_paths
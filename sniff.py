@@ -0,0 +1,131 @@
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables
+SNIFF_BYTES = int(os.getenv("SNIFF_BYTES", str(256 * 1024)))
+SNIFF_FFPROBE = os.getenv("SNIFF_FFPROBE", "true").lower() == "true"
+SNIFF_FFPROBE_TIMEOUT = float(os.getenv("SNIFF_FFPROBE_TIMEOUT", "5"))
+
+# ISO BMFF brands that are audio or still images rather than video
+NON_VIDEO_BRANDS = {b"M4A ", b"M4B ", b"M4P ", b"heic", b"heix", b"mif1", b"msf1", b"avif"}
+
+# QuickTime files without an ftyp box start directly with one of these atoms
+QUICKTIME_ATOMS = {b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+
+# Well-known signatures of formats that are never video
+NON_VIDEO_MAGIC = [
+    b"%PDF", b"PK\x03\x04", b"\x89PNG", b"\xff\xd8\xff", b"GIF8",
+    b"\x7fELF", b"MZ", b"ID3", b"fLaC", b"\x1f\x8b", b"Rar!", b"7z\xbc\xaf",
+]
+
+
+def match_magic(head: bytes) -> Optional[bool]:
+    """
+    Classify a file by its leading bytes: True for a video container,
+    False for a known non-video format, None if the signature is inconclusive
+    """
+    if head[4:8] == b"ftyp":
+        return head[8:12] not in NON_VIDEO_BRANDS
+    if head[4:8] in QUICKTIME_ATOMS:
+        return True
+    if head.startswith(b"\x1a\x45\xdf\xa3"):  # Matroska / WebM
+        return True
+    if head.startswith(b"RIFF"):
+        return head[8:12] == b"AVI "
+    if head.startswith(b"FLV\x01"):
+        return True
+    if head.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):  # ASF / WMV
+        return True
+    if head.startswith((b"\x00\x00\x01\xba", b"\x00\x00\x01\xb3")):  # MPEG-PS / MPEG video
+        return True
+    if len(head) > 376 and head[0] == head[188] == head[376] == 0x47:  # MPEG-TS sync bytes
+        return True
+    if any(head.startswith(magic) for magic in NON_VIDEO_MAGIC):
+        return False
+    return None
+
+
+async def probe_head(head: bytes) -> bool:
+    """Run a bounded ffprobe over the head of a file and check for a video stream"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-probesize', str(max(len(head), 32)),
+        '-show_entries', 'stream=codec_type',
+        '-print_format', 'json',
+        '-i', 'pipe:0'
+    ]
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        logger.warning("ffprobe not found, accepting upload without probing")
+        return True
+
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(head), SNIFF_FFPROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning("ffprobe timed out while sniffing upload")
+        return False
+
+    try:
+        streams = json.loads(stdout or b"{}").get("streams", [])
+    except ValueError:
+        return False
+    return any(stream.get("codec_type") == "video" for stream in streams)
+
+
+async def is_video(head: bytes) -> bool:
+    """Decide from the first bytes of an upload whether it is a video container"""
+    verdict = match_magic(head)
+    if verdict is None and SNIFF_FFPROBE:
+        verdict = await probe_head(head)
+    return bool(verdict)
+
+
+def read_head(source: BinaryIO, size: int = SNIFF_BYTES) -> bytes:
+    """Read the first bytes of a seekable file object and rewind it"""
+    position = source.tell()
+    head = source.read(size)
+    source.seek(position)
+    return head
+
+
+async def peek_stream(stream: AsyncIterator[bytes], size: int = SNIFF_BYTES) -> Tuple[bytes, AsyncIterator[bytes]]:
+    """
+    Read at least size bytes (or the whole body, if shorter) from an async
+    byte stream. Returns the head and a stream that replays it before the rest
+    """
+    chunks = []
+    received = 0
+    async for chunk in stream:
+        chunks.append(chunk)
+        received += len(chunk)
+        if received >= size:
+            break
+
+    async def replay():
+        for chunk in chunks:
+            yield chunk
+        async for chunk in stream:
+            yield chunk
+
+    return b"".join(chunks)[:size], replay()
+
+
+def read_file_head(path: str, size: int = SNIFF_BYTES) -> bytes:
+    """Read the first bytes of a file on disk"""
+    with open(path, 'rb') as f:
+        return f.read(size)
@@ -0,0 +1,71 @@
+"""
+Worker soak test: run many ping tasks and check for leaked connections
+
+Start a worker first (celery -A tasks worker --concurrency 4). The script
+warms the pool up with one batch, records the number of client connections
+MongoDB (serverStatus) and Redis (INFO clients) report, runs the remaining
+tasks and compares. Exits non-zero if either count grew by more than the
+tolerance.
+
+Usage: python soak_worker.py [--tasks 100000] [--batch 1000] [--tolerance 0]
+"""
+import sys
+import time
+import argparse
+import redis
+from celery import group
+from pymongo import MongoClient
+from tasks import MONGODB_URL, REDIS_URL, ping
+
+
+def connection_counts(mongo, redis_client):
+    """Current client connections as seen by MongoDB and Redis"""
+    mongo_connections = mongo.admin.command("serverStatus")["connections"]["current"]
+    redis_connections = redis_client.info("clients")["connected_clients"]
+    return mongo_connections, redis_connections
+
+
+def run_batch(size, timeout):
+    """Run size ping tasks and return the worker PIDs that answered"""
+    result = group(ping.s() for _ in range(size)).apply_async()
+    pids = result.get(timeout=timeout)
+    result.forget()
+    return set(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--tolerance", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    mongo = MongoClient(MONGODB_URL)
+    redis_client = redis.Redis.from_url(REDIS_URL)
+
+    pids = run_batch(args.batch, args.timeout)
+    baseline = connection_counts(mongo, redis_client)
+    print(f"after warm-up: mongodb={baseline[0]} redis={baseline[1]} workers={len(pids)}")
+
+    start = time.perf_counter()
+    done = args.batch
+    while done < args.tasks:
+        size = min(args.batch, args.tasks - done)
+        pids |= run_batch(size, args.timeout)
+        done += size
+        if done % (args.batch * 10) == 0:
+            mongo_connections, redis_connections = connection_counts(mongo, redis_client)
+            print(f"{done:>8} tasks: mongodb={mongo_connections} redis={redis_connections}")
+    elapsed = time.perf_counter() - start
+
+    final = connection_counts(mongo, redis_client)
+    print(f"finished {done} tasks in {elapsed:.0f}s ({(done - args.batch) / elapsed:.0f} tasks/s) on {len(pids)} worker processes")
+    print(f"connections: mongodb {baseline[0]} -> {final[0]}, redis {baseline[1]} -> {final[1]}")
+    leaked = final[0] - baseline[0] > args.tolerance or final[1] - baseline[1] > args.tolerance
+    print("LEAK" if leaked else "OK")
+    sys.exit(1 if leaked else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
 import os
+import json
 import subprocess
 import logging
+from contextlib import contextmanager
 from datetime import datetime
-from celery import Celery
-from pymongo import MongoClient
+from fractions import Fraction
+from celery import Celery, chain
+from celery.exceptions import Ignore
+from celery.signals import worker_process_init, worker_process_shutdown
+from celery.utils.time import get_exponential_backoff_interval
+import redis
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import PyMongoError
 from bson import ObjectId
+from cache import CACHED_PROJECTION, VIDEO_CACHE_TTL, encode_video, video_cache_key
+from events import VIDEO_EVENTS_CHANNEL, encode_event
+from locks import VideoLease
+
+# Optional in-process media backend (MEDIA_BACKEND=pyav)
+try:
+    import av
+except ImportError:
+    av = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,6 +33,30 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", "./thumbnails")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "clipo_ai")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "videos")
+THUMBNAIL_SEEK_MODE = os.getenv("THUMBNAIL_SEEK_MODE", "fast")
+MEDIA_BACKEND = os.getenv("MEDIA_BACKEND", "subprocess")
+WORKER_MONGODB_MAX_POOL_SIZE = int(os.getenv("WORKER_MONGODB_MAX_POOL_SIZE", "4"))
+WORKER_MONGODB_MIN_POOL_SIZE = int(os.getenv("WORKER_MONGODB_MIN_POOL_SIZE", "1"))
+WORKER_REDIS_MAX_CONNECTIONS = int(os.getenv("WORKER_REDIS_MAX_CONNECTIONS", "4"))
+PROBE_QUEUE = os.getenv("PROBE_QUEUE", "probe")
+THUMBNAIL_QUEUE = os.getenv("THUMBNAIL_QUEUE", "thumbnail")
+FINALIZE_QUEUE = os.getenv("FINALIZE_QUEUE", "finalize")
+BULK_THUMBNAIL_QUEUE = os.getenv("BULK_THUMBNAIL_QUEUE", "thumbnail.bulk")
+BULK_LANE_MIN_BYTES = int(os.getenv("BULK_LANE_MIN_BYTES", str(512 * 1024 * 1024)))
+WORKER_CONNECTION_WARMUP = os.getenv("WORKER_CONNECTION_WARMUP", "true").lower() == "true"
+TASK_MAX_RETRIES = int(os.getenv("TASK_MAX_RETRIES", "5"))
+RETRY_BACKOFF_BASE_SECONDS = int(os.getenv("RETRY_BACKOFF_BASE_SECONDS", "5"))
+RETRY_BACKOFF_MAX_SECONDS = int(os.getenv("RETRY_BACKOFF_MAX_SECONDS", "300"))
+
+# Ways of seeking to the thumbnail frame, see seek_args
+SEEK_MODES = ("accurate", "fast", "keyframe")
+
+# A bad seek mode would fail every thumbnail, so refuse to start with one
+if THUMBNAIL_SEEK_MODE not in SEEK_MODES:
+    raise ValueError(f"THUMBNAIL_SEEK_MODE must be one of {', '.join(SEEK_MODES)}, got {THUMBNAIL_SEEK_MODE!r}")
+
+if MEDIA_BACKEND == "pyav" and av is None:
+    logger.warning("MEDIA_BACKEND=pyav but PyAV is not installed, using ffprobe/ffmpeg subprocesses")
 
 # Create directories
 os.makedirs(THUMBNAIL_DIR, exist_ok=True)
@@ -33,12 +74,168 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Cheap and CPU-heavy stages get their own queues so they can be served
+    # by separately sized worker pools (see docker-compose.yml)
+    task_routes={
+        "tasks.probe_stage": {"queue": PROBE_QUEUE},
+        "tasks.thumbnail_stage": {"queue": THUMBNAIL_QUEUE},
+        "tasks.process_video": {"queue": THUMBNAIL_QUEUE},
+        "tasks.finalize_stage": {"queue": FINALIZE_QUEUE},
+    },
+    # A worker consuming several queues takes from them in turn, which keeps
+    # the bulk thumbnail lane from being starved by the regular one
+    broker_transport_options={"queue_order_strategy": "round_robin"},
 )
 
-# MongoDB connection
-mongo_client = MongoClient(MONGODB_URL)
-db = mongo_client[DATABASE_NAME]
-videos_collection = db[COLLECTION_NAME]
+# MongoDB and Redis clients, one set per worker process. They are created
+# after the prefork pool forks (worker_process_init) rather than at import,
+# so no child inherits sockets or monitor threads from the parent
+mongo_client = None
+videos_collection = None
+redis_client = None
+
+def init_resources(warm_up=False):
+    """
+    Create this process's MongoDB and Redis clients if it has none yet.
+    With warm_up the connections are opened right away instead of on the
+    first task
+    """
+    global mongo_client, videos_collection, redis_client
+    if mongo_client is not None:
+        return
+    
+    mongo_client = MongoClient(
+        MONGODB_URL,
+        maxPoolSize=WORKER_MONGODB_MAX_POOL_SIZE,
+        minPoolSize=WORKER_MONGODB_MIN_POOL_SIZE
+    )
+    videos_collection = mongo_client[DATABASE_NAME][COLLECTION_NAME]
+    redis_client = redis.Redis(connection_pool=redis.ConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=WORKER_REDIS_MAX_CONNECTIONS,
+        decode_responses=True
+    ))
+    
+    if warm_up:
+        try:
+            mongo_client.admin.command("ping")
+            redis_client.ping()
+        except Exception as e:
+            logger.warning(f"Connection warm-up failed in worker {os.getpid()}: {e}")
+
+def close_resources():
+    """Close this process's MongoDB and Redis clients"""
+    global mongo_client, videos_collection, redis_client
+    if mongo_client is not None:
+        mongo_client.close()
+    if redis_client is not None:
+        redis_client.connection_pool.disconnect()
+    mongo_client = videos_collection = redis_client = None
+
+def get_videos_collection():
+    """The videos collection of this process, created on first use outside a prefork child"""
+    init_resources()
+    return videos_collection
+
+def get_redis():
+    """The Redis client of this process, created on first use outside a prefork child"""
+    init_resources()
+    return redis_client
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    init_resources(warm_up=WORKER_CONNECTION_WARMUP)
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    close_resources()
+
+def update_video(video_id, fields, condition=None, **progress):
+    """
+    Update a video document, write its new state through to the API's
+    status/metadata cache and publish the change to event subscribers.
+    Every update bumps the document version that the API uses as ETag.
+    condition adds filters the document must match; extra keyword
+    arguments (stage, progress) are added to the event. Returns the
+    updated document, or None if nothing matched
+    """
+    video_doc = get_videos_collection().find_one_and_update(
+        {"_id": ObjectId(video_id), **(condition or {})},
+        {"$set": fields, "$inc": {"version": 1}},
+        projection=CACHED_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if video_doc is None:
+        return None
+    
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(video_cache_key(video_id), encode_video(video_doc), ex=VIDEO_CACHE_TTL)
+        pipe.publish(VIDEO_EVENTS_CHANNEL, encode_event(
+            video_id, video_doc["status"], version=video_doc["version"], **progress
+        ))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Failed to publish state of video {video_id}: {e}")
+    return video_doc
+
+def publish_progress(video_id, stage, progress):
+    """Publish a progress event for a video that is being processed"""
+    try:
+        get_redis().publish(
+            VIDEO_EVENTS_CHANNEL,
+            encode_event(video_id, "processing", stage=stage, progress=progress)
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Failed to publish progress of video {video_id}: {e}")
+
+class MediaError(Exception):
+    """The video itself cannot be processed; retrying will not help"""
+
+class TransientError(Exception):
+    """A failure unrelated to the video that may not happen again, e.g. ffmpeg being killed"""
+
+# Errors worth retrying: the database, the broker/cache, the disk, or a
+# media tool that failed for a reason its stderr does not blame on the input
+TRANSIENT_ERRORS = (TransientError, PyMongoError, redis.RedisError, OSError, subprocess.TimeoutExpired)
+
+# ffprobe/ffmpeg stderr messages meaning the input is corrupt, truncated
+# or has nothing to take a thumbnail from
+MEDIA_ERROR_PATTERNS = (
+    "invalid data found when processing input",
+    "moov atom not found",
+    "could not find codec parameters",
+    "ebml header parsing failed",
+    "unknown input format",
+    "does not contain any stream",
+    "matches no streams",
+    "output file is empty",
+)
+
+# Messages that only blame the input when the line names the video file; a
+# missing THUMBNAIL_DIR or volume produces the same error for the output
+PATH_ERROR_PATTERNS = (
+    "no such file or directory",
+)
+
+def process_error(error, message, video_path):
+    """
+    Exception to raise for a failed ffprobe/ffmpeg run on video_path:
+    MediaError if its stderr says the input is unusable, otherwise
+    TransientError
+    """
+    lines = (error.stderr or "").strip().splitlines()
+    for line in lines:
+        lowered = line.lower()
+        if any(pattern in lowered for pattern in MEDIA_ERROR_PATTERNS) or (
+            video_path in line and any(pattern in lowered for pattern in PATH_ERROR_PATTERNS)
+        ):
+            return MediaError(f"{message}: {line.strip()}")
+    return TransientError(f"{message}: {lines[-1].strip() if lines else error}")
+
+def is_transient(error):
+    """Whether an attempt that failed with this error should be retried"""
+    return isinstance(error, TRANSIENT_ERRORS)
 
 def get_video_duration(video_path):
     """
@@ -47,7 +244,7 @@ def get_video_duration(video_path):
     try:
         cmd = [
             'ffprobe',
-            '-v', 'quiet',
+            '-v', 'error',
             '-print_format', 'json',
             '-show_format',
             video_path
@@ -58,39 +255,105 @@ def get_video_duration(video_path):
         if result.returncode != 0:
             raise Exception(f"FFprobe failed: {result.stderr}")
         
-        import json
         metadata = json.loads(result.stdout)
         
+        if 'duration' not in metadata.get('format', {}):
+            raise MediaError("Video has no duration")
         duration_seconds = float(metadata['format']['duration'])
         
-        # Convert to HH:MM:SS format
-        hours = int(duration_seconds // 3600)
-        minutes = int((duration_seconds % 3600) // 60)
-        seconds = int(duration_seconds % 60)
-        
-        duration_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        
-        return duration_str, duration_seconds
+        return format_duration(duration_seconds), duration_seconds
         
     except subprocess.CalledProcessError as e:
         logger.error(f"FFprobe command failed: {e}")
-        raise Exception(f"Failed to extract duration: {e}")
+        raise process_error(e, "Failed to extract duration", video_path) from e
     except Exception as e:
         logger.error(f"Error extracting duration: {e}")
         raise
 
-def generate_thumbnail(video_path, output_path, duration_seconds):
+def parse_int(value):
+    """int() for ffprobe's numeric strings; None if absent or malformed"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_frame_rate(rate):
+    """Frames per second from an ffprobe rate such as '30000/1001'"""
+    try:
+        numerator, _, denominator = str(rate).partition("/")
+        return round(int(numerator) / int(denominator or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def stream_rotation(stream):
+    """Display rotation of a video stream in degrees (0, 90, 180 or 270)"""
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            return int(side_data["rotation"]) % 360
+    return (parse_int(stream.get("tags", {}).get("rotate")) or 0) % 360
+
+def media_info(probe, duration_seconds):
+    """
+    Document fields describing the container and its main video and audio
+    streams, taken from ffprobe -show_format -show_streams output
+    """
+    info = {
+        "duration_seconds": duration_seconds,
+        "bit_rate": parse_int(probe.get("format", {}).get("bit_rate"))
+    }
+    
+    video = video_stream(probe)
+    if video:
+        info.update({
+            "video_codec": video.get("codec_name"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "frame_rate": parse_frame_rate(video.get("avg_frame_rate")),
+            "rotation": stream_rotation(video)
+        })
+    
+    audio = next((s for s in probe.get("streams", []) if s.get("codec_type") == "audio"), None)
+    if audio:
+        info.update({
+            "audio_codec": audio.get("codec_name"),
+            "audio_channels": audio.get("channels"),
+            "audio_channel_layout": audio.get("channel_layout"),
+            "audio_sample_rate": parse_int(audio.get("sample_rate"))
+        })
+    return info
+
+def seek_args(thumbnail_time, seek_mode=THUMBNAIL_SEEK_MODE):
+    """
+    ffmpeg arguments placed before and after -i to seek to thumbnail_time.
+    
+    accurate: output-side -ss, every frame up to the point is decoded
+    fast:     input-side -ss, jump to the preceding keyframe and decode only
+              the rest of that GOP; same frame, near-constant latency
+    keyframe: input-side -ss on keyframes only; the nearest preceding
+              keyframe is used, nothing else is decoded
+    """
+    if seek_mode == "accurate":
+        return [], ['-ss', str(thumbnail_time)]
+    if seek_mode == "fast":
+        return ['-ss', str(thumbnail_time)], []
+    if seek_mode == "keyframe":
+        return ['-skip_frame', 'nokey', '-noaccurate_seek', '-ss', str(thumbnail_time)], []
+    raise ValueError(f"Unknown thumbnail seek mode: {seek_mode}")
+
+def generate_thumbnail(video_path, output_path, duration_seconds, seek_mode=THUMBNAIL_SEEK_MODE):
     """
     Generate thumbnail at 10% of video duration using FFmpeg
     """
     try:
         # Calculate 10% of duration
         thumbnail_time = duration_seconds * 0.1
+        input_args, output_args = seek_args(thumbnail_time, seek_mode)
         
         cmd = [
             'ffmpeg',
+            *input_args,
             '-i', video_path,
-            '-ss', str(thumbnail_time),
+            *output_args,
             '-vframes', '1',
             '-vf', 'scale=320:240',  # Resize to reasonable thumbnail size
             '-q:v', '2',  # High quality
@@ -108,71 +371,513 @@ def generate_thumbnail(video_path, output_path, duration_seconds):
         
     except subprocess.CalledProcessError as e:
         logger.error(f"FFmpeg command failed: {e}")
-        raise Exception(f"Failed to generate thumbnail: {e}")
+        raise process_error(e, "Failed to generate thumbnail", video_path) from e
     except Exception as e:
         logger.error(f"Error generating thumbnail: {e}")
         raise
 
-@celery_app.task(bind=True)
-def process_video(self, video_id, video_path, stored_filename):
+def format_duration(duration_seconds):
     """
-    Background task to process video: extract duration and generate thumbnail
+    Convert seconds to HH:MM:SS format
     """
+    hours = int(duration_seconds // 3600)
+    minutes = int((duration_seconds % 3600) // 60)
+    seconds = int(duration_seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def probe_video(video_path):
+    """
+    Read format and stream information with a single ffprobe run
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        video_path
+    ]
     try:
-        logger.info(f"Starting video processing for ID: {video_id}")
-        
-        # Update status to processing
-        videos_collection.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": {"status": "processing"}}
-        )
-        
-        # Extract video duration
-        logger.info(f"Extracting duration for: {video_path}")
-        duration_str, duration_seconds = get_video_duration(video_path)
-        logger.info(f"Duration extracted: {duration_str}")
-        
-        # Generate thumbnail
-        thumbnail_filename = f"thumb_{os.path.splitext(stored_filename)[0]}.jpg"
-        thumbnail_path = os.path.join(THUMBNAIL_DIR, thumbnail_filename)
-        
-        logger.info(f"Generating thumbnail: {thumbnail_path}")
-        generate_thumbnail(video_path, thumbnail_path, duration_seconds)
-        
-        # Update MongoDB with results
-        update_data = {
-            "status": "done",
-            "duration": duration_str,
-            "thumbnail_filename": thumbnail_filename,
-            "processed_time": datetime.utcnow().isoformat()
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise process_error(e, "Failed to probe video", video_path) from e
+    return json.loads(result.stdout)
+
+def probe_duration(probe):
+    """
+    Duration in seconds from probe output; the container's if it has one,
+    otherwise the longest stream's
+    """
+    duration = probe.get("format", {}).get("duration")
+    if duration is None:
+        durations = [float(s["duration"]) for s in probe.get("streams", []) if s.get("duration")]
+        duration = max(durations, default=None)
+    if duration is None:
+        raise MediaError("Video has no duration")
+    return float(duration)
+
+def video_stream(probe):
+    """
+    The main video stream of probe output, skipping embedded cover art
+    """
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == "video" and not stream.get("disposition", {}).get("attached_pic"):
+            return stream
+    return None
+
+def extract_thumbnail(video_path, output_path, thumbnail_time, format_name, stream_index,
+                      seek_mode=THUMBNAIL_SEEK_MODE):
+    """
+    Generate a thumbnail with the container format and video stream already
+    known from the probe, so ffmpeg skips format detection and does not
+    demux audio, subtitle or data packets
+    """
+    input_args, output_args = seek_args(thumbnail_time, seek_mode)
+    cmd = [
+        'ffmpeg',
+        '-v', 'error',
+        '-f', format_name,
+        *input_args,
+        '-i', video_path,
+        '-map', f'0:{stream_index}',
+        '-an', '-sn', '-dn',
+        *output_args,
+        '-frames:v', '1',
+        '-vf', 'scale=320:240',
+        '-q:v', '2',
+        '-y',
+        output_path
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+def probe_container(container):
+    """
+    Describe an open PyAV container in the shape of ffprobe's
+    -show_format -show_streams JSON, so both backends share one parser
+    """
+    streams = []
+    for stream in container.streams:
+        info = {
+            "index": stream.index,
+            "codec_type": stream.type,
+            "codec_name": stream.codec_context.name,
+            "disposition": {
+                "attached_pic": int(bool(stream.disposition & av.stream.Disposition.attached_pic))
+            }
         }
-        
-        videos_collection.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": update_data}
+        if stream.duration is not None and stream.time_base is not None:
+            info["duration"] = float(stream.duration * stream.time_base)
+        if stream.type == "video":
+            info["width"] = stream.codec_context.width
+            info["height"] = stream.codec_context.height
+            if stream.average_rate:
+                info["avg_frame_rate"] = f"{stream.average_rate.numerator}/{stream.average_rate.denominator}"
+        elif stream.type == "audio":
+            info["sample_rate"] = stream.codec_context.sample_rate
+            info["channels"] = stream.codec_context.channels
+            info["channel_layout"] = stream.layout.name
+        streams.append(info)
+    
+    format_info = {"format_name": container.format.name, "bit_rate": container.bit_rate}
+    if container.duration is not None:
+        format_info["duration"] = container.duration / av.time_base
+    return {"format": format_info, "streams": streams}
+
+def decode_thumbnail_frame(container, stream, thumbnail_time, seek_mode):
+    """
+    Decode the thumbnail frame with the same seek semantics as seek_args:
+    accurate decodes from the start, fast seeks to the preceding keyframe
+    and decodes up to the target, keyframe only decodes keyframes
+    """
+    if seek_mode not in SEEK_MODES:
+        raise ValueError(f"Unknown thumbnail seek mode: {seek_mode}")
+    if seek_mode == "keyframe":
+        stream.codec_context.skip_frame = "NONKEY"
+    if seek_mode != "accurate":
+        container.seek(int(thumbnail_time / stream.time_base), stream=stream, backward=True)
+    
+    frame = None
+    for frame in container.decode(stream):
+        if seek_mode == "keyframe" or frame.time is None or frame.time >= thumbnail_time:
+            break
+    if frame is None:
+        raise MediaError("No video frame could be decoded")
+    return frame
+
+# Filters turning a frame upright, keyed by the counterclockwise display
+# rotation; the same ones ffmpeg inserts when it autorotates
+ROTATION_FILTERS = {
+    90: [("transpose", "cclock")],
+    180: [("hflip", None), ("vflip", None)],
+    270: [("transpose", "clock")],
+}
+
+def upright_frame(frame):
+    """Apply a frame's display rotation to its pixels"""
+    filters = ROTATION_FILTERS.get(round(getattr(frame, "rotation", 0)) % 360)
+    if not filters:
+        return frame
+    graph = av.filter.Graph()
+    nodes = [graph.add_buffer(width=frame.width, height=frame.height, format=frame.format,
+                              time_base=Fraction(1, 25))]
+    nodes += [graph.add(name, args) for name, args in filters]
+    nodes.append(graph.add("buffersink"))
+    graph.link_nodes(*nodes).configure()
+    graph.vpush(frame)
+    return graph.vpull()
+
+def encode_thumbnail(frame, output_path):
+    """
+    Turn a frame upright, scale it to 320x240 and write it as a JPEG
+    with the quality of ffmpeg's -q:v 2
+    """
+    thumbnail = upright_frame(frame).reformat(width=320, height=240, format="yuvj420p")
+    encoder = av.CodecContext.create("mjpeg", "w")
+    encoder.width = 320
+    encoder.height = 240
+    encoder.pix_fmt = "yuvj420p"
+    encoder.time_base = Fraction(1, 25)
+    encoder.qmin = encoder.qmax = 2
+    packets = encoder.encode(thumbnail) + encoder.encode(None)
+    with open(output_path, 'wb') as f:
+        for packet in packets:
+            f.write(bytes(packet))
+
+def probe_media(video_path, backend=MEDIA_BACKEND):
+    """
+    Probe output for a file in ffprobe's shape, read in-process with PyAV
+    when that backend is selected and works, otherwise with ffprobe
+    """
+    if backend == "pyav" and av is not None:
+        try:
+            with av.open(video_path) as container:
+                return probe_container(container)
+        except Exception as e:
+            logger.warning(f"PyAV probe failed for {video_path}, using ffprobe: {e}")
+    return probe_video(video_path)
+
+def render_thumbnail(video_path, thumbnail_path, duration_seconds, format_name=None, stream_index=None,
+                     seek_mode=THUMBNAIL_SEEK_MODE, backend=MEDIA_BACKEND):
+    """
+    Write the thumbnail at 10% of the duration with the configured backend,
+    using the probed container format and stream when known. Returns the
+    rotation PyAV read from the decoded frame, or None
+    """
+    thumbnail_time = duration_seconds * 0.1
+    if backend == "pyav" and av is not None:
+        try:
+            with av.open(video_path) as container:
+                stream = container.streams[stream_index] if stream_index is not None else container.streams.video[0]
+                frame = decode_thumbnail_frame(container, stream, thumbnail_time, seek_mode)
+                encode_thumbnail(frame, thumbnail_path)
+                return getattr(frame, "rotation", 0) % 360
+        except Exception as e:
+            logger.warning(f"PyAV thumbnail failed for {video_path}, using ffmpeg: {e}")
+    
+    if format_name is not None and stream_index is not None:
+        try:
+            extract_thumbnail(video_path, thumbnail_path, thumbnail_time, format_name, stream_index, seek_mode)
+            return None
+        except Exception as e:
+            logger.warning(f"Hinted thumbnail extraction failed for {video_path}, retrying without hints: {e}")
+    generate_thumbnail(video_path, thumbnail_path, duration_seconds, seek_mode)
+    return None
+
+def thumbnail_lane(video_path):
+    """
+    Queue for a video's thumbnail stage. Files of BULK_LANE_MIN_BYTES or
+    more go to the bulk lane so a batch of long recordings cannot hold up
+    short clips uploaded after it. Thumbnail workers consume both lanes
+    round-robin, so bulk jobs still get every other free slot
+    """
+    try:
+        size = os.path.getsize(video_path)
+    except OSError:
+        return THUMBNAIL_QUEUE
+    return BULK_THUMBNAIL_QUEUE if size >= BULK_LANE_MIN_BYTES else THUMBNAIL_QUEUE
+
+def processing_pipeline(video_id, video_path, stored_filename, task_id=None):
+    """
+    Canvas that processes a video as probe -> thumbnail -> finalize, each
+    stage on its own queue and the thumbnail stage in the lane picked by
+    thumbnail_lane. task_id, if given, becomes the ID of the last stage,
+    which is also the ID of the result returned by apply_async()
+    """
+    finalize = finalize_stage.s()
+    if task_id:
+        finalize = finalize.set(task_id=task_id)
+    return chain(
+        probe_stage.s(video_id, video_path, stored_filename),
+        thumbnail_stage.s().set(queue=thumbnail_lane(video_path)),
+        finalize
+    )
+
+# Statuses in which a video may still be (re)processed
+ACTIVE_STATUSES = ["pending", "processing"]
+
+def mark_failed(video_id, error):
+    """Record a processing error on the video, unless it already finished"""
+    update_video(video_id, {
+        "status": "failed",
+        "error_message": str(error),
+        "processed_time": datetime.utcnow().isoformat()
+    }, condition={"status": {"$in": ACTIVE_STATUSES}})
+
+def claim_video(video_id, token):
+    """
+    Compare-and-set the video from pending to processing under a lease
+    token. A video already processing is an earlier attempt being retried
+    or taken over after its worker's lease expired, so only the token is
+    replaced. False if the video is done, failed or gone
+    """
+    if update_video(video_id, {"status": "processing", "processing_token": token}, condition={"status": "pending"}):
+        return True
+    result = get_videos_collection().update_one(
+        {"_id": ObjectId(video_id), "status": "processing"},
+        {"$set": {"processing_token": token}}
+    )
+    return result.matched_count > 0
+
+@contextmanager
+def video_lease(task, video_id):
+    """
+    Hold the video's processing lease and claim it for the body of a task,
+    yielding the lease. A duplicate delivery, i.e. one arriving while
+    another worker holds the lease or after the video finished, is dropped
+    at once with Ignore
+    """
+    lease = VideoLease(get_redis(), video_id)
+    try:
+        if not lease.acquire():
+            logger.info(f"Video {video_id} is being processed by another worker, dropping duplicate {task.name}")
+            raise Ignore()
+        if not claim_video(video_id, lease.token):
+            logger.info(f"Video {video_id} is no longer pending or processing, dropping duplicate {task.name}")
+            raise Ignore()
+        yield lease
+    finally:
+        lease.release()
+
+def ensure_lease(lease, video_id):
+    """
+    Stop with Ignore if the lease has been lost, so a worker whose video
+    was taken over writes no checkpoint, thumbnail or result
+    """
+    if not lease.held():
+        logger.warning(f"Lost the processing lease of video {video_id}, discarding this attempt's results")
+        raise Ignore()
+
+def retry_or_fail(task, video_id, error):
+    """
+    Failure policy of the processing tasks; always raises. Transient errors
+    are retried with exponential backoff and full jitter while the video
+    stays in processing. A permanent error, or a transient one on the last
+    attempt, marks the video failed and fails the task
+    """
+    retries = task.request.retries
+    if is_transient(error) and retries < task.max_retries:
+        countdown = get_exponential_backoff_interval(
+            RETRY_BACKOFF_BASE_SECONDS, retries, RETRY_BACKOFF_MAX_SECONDS, full_jitter=True
+        )
+        logger.warning(
+            f"Transient error on video {video_id}, retry {retries + 1}/{task.max_retries} in {countdown}s: {error}"
         )
+        raise task.retry(exc=error, countdown=countdown)
+    mark_failed(video_id, error)
+    raise error
+
+def load_checkpoints(video_id):
+    """Stage results already stored on the video document"""
+    video_doc = get_videos_collection().find_one({"_id": ObjectId(video_id)}, {"stages": 1})
+    return (video_doc or {}).get("stages", {})
+
+def save_checkpoint(video_id, stage, result):
+    """Store a stage's result so a retry or redelivery can skip the stage"""
+    get_videos_collection().update_one(
+        {"_id": ObjectId(video_id)},
+        {"$set": {f"stages.{stage}": result}}
+    )
+
+def run_probe(video_id, video_path, stored_filename, lease):
+    """
+    Mark the video as processing and probe it, unless an earlier attempt
+    already stored the probe result. Returns the processing context
+    """
+    logger.info(f"Starting video processing for ID: {video_id}")
+    publish_progress(video_id, "probe", 0.0)
+    
+    context = {"video_id": video_id, "video_path": video_path, "stored_filename": stored_filename}
+    checkpoint = load_checkpoints(video_id).get("probe")
+    if checkpoint:
+        logger.info(f"Reusing probe checkpoint for video {video_id}")
+        return {**context, **checkpoint}
+    
+    try:
+        probe = probe_media(video_path)
+        duration_seconds = probe_duration(probe)
+        stream = video_stream(probe)
+        if stream is None:
+            raise MediaError("No video stream found")
+        result = {
+            "duration_seconds": duration_seconds,
+            "format_name": probe["format"]["format_name"].split(",")[0],
+            "stream_index": stream["index"],
+            "media": media_info(probe, duration_seconds)
+        }
+    except MediaError:
+        raise
+    except Exception as e:
+        logger.warning(f"Probe failed for {video_path}, using duration-only probe: {e}")
+        _, duration_seconds = get_video_duration(video_path)
+        result = {"duration_seconds": duration_seconds, "media": {"duration_seconds": duration_seconds}}
+    
+    logger.info(f"Duration extracted: {format_duration(result['duration_seconds'])}")
+    ensure_lease(lease, video_id)
+    save_checkpoint(video_id, "probe", result)
+    return {**context, **result}
+
+def run_thumbnail(context, lease):
+    """
+    Generate the thumbnail at 10% of the duration, unless an earlier attempt
+    already stored one that is still on disk. It is rendered to a file of
+    this lease and only moved into place while the lease is still held
+    """
+    video_id = context["video_id"]
+    publish_progress(video_id, "thumbnail", 0.5)
+    
+    checkpoint = load_checkpoints(video_id).get("thumbnail")
+    if checkpoint and os.path.exists(os.path.join(THUMBNAIL_DIR, checkpoint["thumbnail_filename"])):
+        logger.info(f"Reusing thumbnail checkpoint for video {video_id}")
+        result = checkpoint
+    else:
+        thumbnail_filename = f"thumb_{os.path.splitext(context['stored_filename'])[0]}.jpg"
+        thumbnail_path = os.path.join(THUMBNAIL_DIR, thumbnail_filename)
         
-        logger.info(f"Video processing completed for ID: {video_id}")
+        rendering_path = os.path.join(THUMBNAIL_DIR, f"{os.path.splitext(thumbnail_filename)[0]}.{lease.token}.jpg")
         
-        return {
-            "video_id": video_id,
-            "status": "done",
-            "duration": duration_str,
-            "thumbnail_filename": thumbnail_filename
-        }
+        logger.info(f"Generating thumbnail: {thumbnail_path}")
+        try:
+            rotation = render_thumbnail(
+                context["video_path"],
+                rendering_path,
+                context["duration_seconds"],
+                context.get("format_name"),
+                context.get("stream_index")
+            )
+            ensure_lease(lease, video_id)
+            os.replace(rendering_path, thumbnail_path)
+        finally:
+            if os.path.exists(rendering_path):
+                os.remove(rendering_path)
+        logger.info(f"Thumbnail generated successfully: {thumbnail_path}")
+        result = {"thumbnail_filename": thumbnail_filename, "rotation": rotation}
+        save_checkpoint(video_id, "thumbnail", result)
+    
+    if result.get("rotation") is not None and "rotation" in context["media"]:
+        context["media"]["rotation"] = result["rotation"]
+    return {**context, "thumbnail_filename": result["thumbnail_filename"]}
+
+def run_finalize(context, lease):
+    """
+    Store the results and mark the video as done, provided the lease is
+    still held and the claim made with its token still stands
+    """
+    video_id = context["video_id"]
+    ensure_lease(lease, video_id)
+    duration_str = format_duration(context["duration_seconds"])
+    video_doc = update_video(video_id, {
+        "status": "done",
+        "duration": duration_str,
+        "thumbnail_filename": context["thumbnail_filename"],
+        "processed_time": datetime.utcnow().isoformat(),
+        **context["media"]
+    }, condition={"status": "processing", "processing_token": lease.token}, stage="done", progress=1.0)
+    if video_doc is None:
+        # The lease was lost and another worker has claimed the video since
+        logger.warning(f"Video {video_id} was claimed by another worker, discarding this result")
+        raise Ignore()
+    
+    logger.info(f"Video processing completed for ID: {video_id}")
+    
+    return {
+        "video_id": video_id,
+        "status": "done",
+        "duration": duration_str,
+        "thumbnail_filename": context["thumbnail_filename"]
+    }
+
+@celery_app.task(bind=True, max_retries=TASK_MAX_RETRIES)
+def probe_stage(self, video_id, video_path, stored_filename):
+    """
+    Pipeline stage 1: mark the video as processing and probe it. Returns
+    the context passed on to the thumbnail stage
+    """
+    try:
+        with video_lease(self, video_id) as lease:
+            return run_probe(video_id, video_path, stored_filename, lease)
+    except Ignore:
+        raise
+    except Exception as e:
+        logger.error(f"Error probing video {video_id}: {e}")
+        retry_or_fail(self, video_id, e)
+
+@celery_app.task(bind=True, max_retries=TASK_MAX_RETRIES)
+def thumbnail_stage(self, context):
+    """
+    Pipeline stage 2: generate the thumbnail at 10% of the duration
+    """
+    try:
+        with video_lease(self, context["video_id"]) as lease:
+            return run_thumbnail(context, lease)
+    except Ignore:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating thumbnail for video {context['video_id']}: {e}")
+        retry_or_fail(self, context["video_id"], e)
+
+@celery_app.task(bind=True, max_retries=TASK_MAX_RETRIES)
+def finalize_stage(self, context):
+    """
+    Pipeline stage 3: store the results and mark the video as done
+    """
+    try:
+        with video_lease(self, context["video_id"]) as lease:
+            return run_finalize(context, lease)
+    except Ignore:
+        raise
+    except Exception as e:
+        logger.error(f"Error finalizing video {context['video_id']}: {e}")
+        retry_or_fail(self, context["video_id"], e)
+
+@celery_app.task
+def ping():
+    """
+    Round trip to MongoDB and Redis through this process's clients; used by
+    soak_worker.py to check that connections are reused, not leaked
+    """
+    get_videos_collection().database.command("ping")
+    get_redis().ping()
+    return os.getpid()
+
+@celery_app.task(bind=True, max_retries=TASK_MAX_RETRIES)
+def process_video(self, video_id, video_path, stored_filename):
+    """
+    Background task to process video: extract duration and generate thumbnail.
+    New uploads go through processing_pipeline; this single-task version
+    stays registered for messages queued before the split
+    """
+    try:
+        # Duplicate deliveries of the task are dropped by the lease
+        with video_lease(self, video_id) as lease:
+            # Each stage is checkpointed, so a retry resumes where the last attempt stopped
+            context = run_probe(video_id, video_path, stored_filename, lease)
+            context = run_thumbnail(context, lease)
+            return run_finalize(context, lease)
         
+    except Ignore:
+        raise
     except Exception as e:
         logger.error(f"Error processing video {video_id}: {e}")
         
-        # Update status to failed
-        videos_collection.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": {
-                "status": "failed",
-                "error_message": str(e),
-                "processed_time": datetime.utcnow().isoformat()
-            }}
-        )
-        
-        # Re-raise exception to mark task as failed
-        raise self.retry(exc=e, countdown=60, max_retries=3)
+        # Retry transient errors; mark the video failed on permanent ones or the last attempt
+        retry_or_fail(self, video_id, e)
@@ -0,0 +1,227 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, BinaryIO, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Environment variables
+UPLOAD_BUFFER_SIZE = int(os.getenv("UPLOAD_BUFFER_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_BUFFER_POOL_SIZE = int(os.getenv("UPLOAD_BUFFER_POOL_SIZE", "8"))
+UPLOAD_PREALLOCATE = os.getenv("UPLOAD_PREALLOCATE", "true").lower() == "true"
+UPLOAD_STREAM_FLUSH_BYTES = int(os.getenv("UPLOAD_STREAM_FLUSH_BYTES", str(1024 * 1024)))
+
+# Most blocks handed to one pwritev call; Linux's IOV_MAX is 1024
+MAX_WRITE_BLOCKS = 1024
+
+
+class UploadLimitExceeded(Exception):
+    """Raised when a streamed body is larger than the caller allowed"""
+
+
+class UploadInterrupted(Exception):
+    """
+    Raised when a streamed body fails part-way, e.g. the client disconnects.
+    Everything received before that is on disk; written is its length
+    """
+
+    def __init__(self, written: int):
+        super().__init__(f"Body stream ended after {written} bytes")
+        self.written = written
+
+
+class BufferPool:
+    """
+    Reusable copy buffers shared by all uploads in the process. Buffers are
+    allocated on first use and up to max_buffers released ones are kept, so
+    an idle process holds no upload memory
+    """
+
+    def __init__(self, buffer_size: int, max_buffers: int):
+        self.buffer_size = buffer_size
+        self.max_buffers = max_buffers
+        self._buffers = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        """Take a buffer from the pool, allocating a new one if it is empty"""
+        with self._lock:
+            if self._buffers:
+                return self._buffers.pop()
+        return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray):
+        """Return a buffer to the pool"""
+        with self._lock:
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(buffer)
+
+
+class UploadEngine:
+    """
+    Copies upload bodies to their destination with as few syscalls and
+    userspace copies as possible
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = UPLOAD_BUFFER_SIZE,
+        pool_size: int = UPLOAD_BUFFER_POOL_SIZE,
+        preallocate: bool = UPLOAD_PREALLOCATE,
+        stream_flush_bytes: int = UPLOAD_STREAM_FLUSH_BYTES,
+    ):
+        self.pool = BufferPool(buffer_size, pool_size)
+        self.preallocate = preallocate
+        self.stream_flush_bytes = stream_flush_bytes
+
+    def copy_fileobj(self, source: BinaryIO, destination: str, size: Optional[int] = None,
+                     hasher=None) -> int:
+        """
+        Copy a file object to destination, returning the number of bytes written.
+        If hasher is given it is updated with every byte copied.
+        Blocking; run it in a worker thread.
+        """
+        fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if size:
+                self._preallocate(fd, size)
+
+            written = self._copy_buffered(source, fd, hasher)
+
+            if size and written != size:
+                # Drop any preallocated tail beyond what was actually received
+                os.ftruncate(fd, written)
+            return written
+        finally:
+            os.close(fd)
+
+    def create_file(self, destination: str, size: int):
+        """Create an empty destination file of the given size for offset writes"""
+        fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            self._preallocate(fd, size)
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+
+    def _preallocate(self, fd: int, size: int):
+        """Reserve disk blocks for the whole file up front to avoid fragmentation"""
+        if not self.preallocate or not hasattr(os, "posix_fallocate"):
+            return
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError as e:
+            logger.debug(f"fallocate not supported for upload target: {e}")
+
+    def _copy_buffered(self, source: BinaryIO, fd: int, hasher=None) -> int:
+        """Copy through a pooled buffer, one read and one write per buffer"""
+        written = 0
+        buffer = self.pool.acquire()
+        try:
+            view = memoryview(buffer)
+            while True:
+                n = source.readinto(view)
+                if not n:
+                    return written
+                pending = view[:n]
+                if hasher is not None:
+                    hasher.update(pending)
+                while pending:
+                    pending = pending[os.write(fd, pending):]
+                written += n
+        finally:
+            self.pool.release(buffer)
+
+    async def save(self, source: BinaryIO, destination: str, size: Optional[int] = None,
+                   hasher=None) -> int:
+        """Copy source to destination in a worker thread"""
+        return await asyncio.to_thread(self.copy_fileobj, source, destination, size, hasher)
+
+    async def write_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        destination: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        hasher=None,
+    ) -> int:
+        """
+        Write an async byte stream into an existing file starting at offset.
+        Network chunks are collected until stream_flush_bytes have arrived
+        and then written with one pwritev, so a request only holds the data
+        it has received and not yet written, never a whole pooled buffer
+        while it waits on a slow client. If hasher is given it is updated
+        with every byte written. If the stream fails, the bytes received so
+        far are written and UploadInterrupted reports how many
+        """
+        fd = await asyncio.to_thread(os.open, destination, os.O_WRONLY)
+        pending: List[bytes] = []
+        pending_size = written = 0
+
+        async def flush():
+            nonlocal pending, pending_size, written
+            await asyncio.to_thread(_write_blocks, fd, pending, offset + written, hasher)
+            written += pending_size
+            pending, pending_size = [], 0
+
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    if pending:
+                        await flush()
+                    raise UploadInterrupted(written) from e
+                if limit is not None and written + pending_size + len(chunk) > limit:
+                    raise UploadLimitExceeded(f"Body exceeds {limit} bytes")
+                if not chunk:
+                    continue
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= self.stream_flush_bytes or len(pending) == MAX_WRITE_BLOCKS:
+                    await flush()
+            if pending:
+                await flush()
+            return written
+        finally:
+            await asyncio.to_thread(os.close, fd)
+
+
+def _write_blocks(fd: int, blocks: List[bytes], offset: int, hasher=None):
+    """Hash blocks if requested and write all of them contiguously at offset"""
+    if hasher is not None:
+        for block in blocks:
+            hasher.update(block)
+    if not hasattr(os, "pwritev"):
+        for block in blocks:
+            _pwrite_all(fd, memoryview(block), offset)
+            offset += len(block)
+        return
+    views = [memoryview(block) for block in blocks]
+    first = 0
+    while first < len(views):
+        n = os.pwritev(fd, views[first:], offset)
+        offset += n
+        # Skip the blocks written in full and trim a partially written one
+        while n and n >= len(views[first]):
+            n -= len(views[first])
+            first += 1
+        if n:
+            views[first] = views[first][n:]
+
+
+def _pwrite_all(fd: int, data: memoryview, offset: int):
+    """pwrite all of data at offset"""
+    while data:
+        n = os.pwrite(fd, data, offset)
+        data = data[n:]
+        offset += n
+
+
+# Shared engine instance
+upload_engine = UploadEngine()